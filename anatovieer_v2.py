@@ -1,6 +1,25 @@
+import time
+
+_START_TIME = time.perf_counter()  # origin of the startup measurements
+
 import sys
 import os
 import re
+import json
+import math
+import itertools
+import heapq
+import bisect
+import hashlib
+import mmap
+import struct
+import zlib
+import sqlite3
+import threading
+import queue
+import contextlib
+import functools
+from collections import OrderedDict, deque
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -10,6 +29,7 @@ from PyQt6.QtWidgets import (
     QGraphicsScene,
     QGraphicsView,
     QGraphicsPixmapItem,
+    QGraphicsItem,
     QCheckBox,
     QSlider,
     QPushButton,
@@ -20,21 +40,58 @@ from PyQt6.QtWidgets import (
     QLabel,
     QFrame,
     QMessageBox,
+    QInputDialog,
+    QProgressDialog,
     QStackedWidget,
-    QGridLayout,
+    QListView,
+    QAbstractItemView,
+    QStyledItemDelegate,
+    QStyle,
     QSizePolicy,
 )
 from PyQt6.QtGui import (
     QPixmap,
+    QImage,
     QPainter,
     QColor,
     QWheelEvent,
     QBrush,
     QCursor,
     QFont,
+    QFontMetrics,
     QIcon,
+    QPen,
+    QPixmapCache,
+    QImageReader,
+    QImageIOHandler,
+    QTransform,
+    QShortcut,
+    QKeySequence,
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QSize, QSettings, QTimer, QPoint
+from PyQt6.QtCore import (
+    Qt,
+    pyqtSignal,
+    QSize,
+    QSettings,
+    QTimer,
+    QEvent,
+    QPoint,
+    QStandardPaths,
+    QByteArray,
+    QBuffer,
+    QIODevice,
+    QObject,
+    QRunnable,
+    QThread,
+    QThreadPool,
+    QRect,
+    QRectF,
+    QPointF,
+    QAbstractListModel,
+    QModelIndex,
+    QFileSystemWatcher,
+)
+from PyQt6 import sip
 
 
 # --- HELPER FUNCTION: NATURAL SORT ---
@@ -51,8 +108,2624 @@ def natural_sort_key(s):
 # --- CONFIGURATION ---
 APP_NAME = "AnatoViewer Pro"
 VALID_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+PACK_EXT = ".anato"  # Packed single-file schema (see SchemaPack)
 ORGANIZATION_NAME = "MedicalStudentApps"
 DOMAIN_NAME = "AnatoViewer"
+THUMB_MAX_SIZE = 480  # Largest card (400px) thumbnail area fits inside this
+THUMB_CACHE_MB = 256  # Default on-disk budget, overridable via QSettings
+THUMB_LEVELS = (96, 160, 256, 384)  # In-memory card thumbnail mipmaps (box edge)
+THUMB_AHEAD_SCREENS = 2  # Off-screen viewports of cards thumbnailed above/below
+LAYER_PREVIEW_SIZE = 400  # Editor layer hover preview (box edge)
+PREVIEW_CACHE_MB = 64  # In-memory hover previews kept by the thumbnail loader
+TILE_SIZE = 512  # Canvas tile edge, in pixels of the pyramid level
+TILE_CACHE_MB = 256  # Budget of the shared QPixmapCache holding canvas tiles
+LAYER_CACHE_MB = 1024  # Decoded layers kept across schema opens (QSettings)
+FLATTEN_MAX_PX = 4096  # Longest edge of a flattened layer composite
+PICK_MASK_SIZE = 512  # Canvas picking grid, in cells along the longer edge
+PICK_ALPHA = 24  # Mean cell alpha (0-255) counted as part of a structure
+PICK_MIN_OPACITY = 0.15  # Fainter layers are not picked
+SCAN_THREADS = 8  # Concurrent folder listings (network shares are latency-bound)
+DECODE_PROCESSES = 0  # Pillow decode worker processes (QSettings); 0: Qt in-process
+TRACE_MAX_EVENTS = 200_000  # Oldest spans are dropped past this
+
+
+# --- TRACING ---
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.add(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+class Tracer:
+    """
+    Records timed spans as Chrome trace events (chrome://tracing, Perfetto).
+    Off by default: span() then returns a shared no-op context manager, so
+    instrumented hot paths only pay for one attribute check.
+    Set ANATO_TRACE=<file.json> to trace a whole session (written on exit),
+    or toggle it at runtime with Ctrl+Shift+T.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events = deque(maxlen=TRACE_MAX_EVENTS)
+        self.origin = time.perf_counter_ns()
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, args)
+
+    def add(self, name, start_ns, end_ns, args=None):
+        # deque.append is atomic: worker threads record without a lock
+        thread = threading.current_thread()
+        self.events.append((name, start_ns, end_ns, thread.ident, thread.name, args))
+
+    def start(self):
+        self.events.clear()
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+
+    def export(self, path):
+        """Writes the recorded spans as trace-event JSON; returns the count."""
+        pid = os.getpid()
+        events = []
+        threads = {}
+        for name, start, end, tid, thread_name, args in list(self.events):
+            threads[tid] = thread_name
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self.origin) / 1000,
+                "dur": (end - start) / 1000,
+                "pid": pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            events.append(event)
+        for tid, thread_name in threads.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": thread_name},
+                }
+            )
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events) - len(threads)
+
+
+TRACER = Tracer()
+
+
+def traced(name):
+    """Decorator form of TRACER.span() for coarse-grained functions."""
+
+    def wrap(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            with _Span(TRACER, name, None):
+                return func(*args, **kwargs)
+
+        return inner
+
+    return wrap
+
+
+# --- LAYER LISTING ---
+def list_layer_files(path):
+    """
+    Returns the schema folder's layer files as (name, size, mtime_ns)
+    tuples, naturally sorted so index 0 is the background layer.
+    """
+    layers = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.lower().endswith(VALID_EXTS) and entry.is_file():
+                st = entry.stat()
+                layers.append((entry.name, st.st_size, st.st_mtime_ns))
+    layers.sort(key=lambda l: natural_sort_key(l[0]))
+    return layers
+
+
+def is_schema_pack(path):
+    return path.lower().endswith(PACK_EXT) and os.path.isfile(path)
+
+
+def list_schema_layers(path):
+    """
+    Returns the schema's layers as (name, size, mtime_ns) tuples, naturally
+    sorted so index 0 is the background layer. A packed schema lists its
+    layer names with the pack file's size and mtime.
+    """
+    if is_schema_pack(path):
+        st = os.stat(path)
+        return [(name, st.st_size, st.st_mtime_ns) for name in read_pack_names(path)]
+    return list_layer_files(path)
+
+
+def schema_canvas_size(path, layers):
+    """Size of the schema's canvas, read from headers only (invalid if unknown)."""
+    if is_schema_pack(path):
+        try:
+            return SchemaPack.open(path).canvas_size
+        except (OSError, ValueError):
+            return QSize()
+    return QImageReader(os.path.join(path, layers[0][0])).size()
+
+
+def layer_display_name(filename):
+    """'-3-nerf_vague.png' -> '-3-Nerf Vague' (as shown in the layer panel)."""
+    return os.path.splitext(filename)[0].replace("_", " ").title()
+
+
+def layer_signature(layers):
+    """Digest of layer names, sizes and mtimes. Changes whenever any layer does."""
+    h = hashlib.sha1()
+    for name, size, mtime in layers:
+        h.update(f"{name}|{size}|{mtime}\n".encode("utf-8", "surrogateescape"))
+    return h.hexdigest()
+
+
+# --- PERSISTENT THUMBNAIL CACHE ---
+def get_cache_dir():
+    path = os.environ.get("ANATO_CACHE_DIR") or os.path.join(
+        QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.GenericCacheLocation
+        ),
+        DOMAIN_NAME,
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class ThumbnailCache:
+    """
+    SQLite store of composite thumbnails (PNG blobs).
+    One row per schema path; a row is only valid while its layer signature
+    matches. Total blob size is bounded, least recently used rows go first.
+    """
+
+    def __init__(self, db_path, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS thumbs ("
+            "path TEXT PRIMARY KEY, signature TEXT NOT NULL, data BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS thumbs_lru ON thumbs (last_access)"
+        )
+        self._db.commit()
+        row = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM thumbs").fetchone()
+        self._total = row[0]
+
+    def get(self, path, signature):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT signature, data FROM thumbs WHERE path = ?", (path,)
+            ).fetchone()
+            if row is None or row[0] != signature:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute(
+                "UPDATE thumbs SET last_access = ? WHERE path = ?", (time.time(), path)
+            )
+            self._db.commit()
+            return bytes(row[1])
+
+    def put(self, path, signature, data):
+        data = bytes(data)
+        with self._lock:
+            old = self._db.execute(
+                "SELECT size FROM thumbs WHERE path = ?", (path,)
+            ).fetchone()
+            if old:
+                self._total -= old[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO thumbs VALUES (?, ?, ?, ?, ?)",
+                (path, signature, data, len(data), time.time()),
+            )
+            self._total += len(data)
+            self._evict()
+            self._db.commit()
+
+    def contains(self, path, signature):
+        """True when a valid thumbnail is stored (does not touch LRU order)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT signature FROM thumbs WHERE path = ?", (path,)
+            ).fetchone()
+            return row is not None and row[0] == signature
+
+    def invalidate(self, path):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size FROM thumbs WHERE path = ?", (path,)
+            ).fetchone()
+            if row:
+                self._total -= row[0]
+                self._db.execute("DELETE FROM thumbs WHERE path = ?", (path,))
+                self._db.commit()
+
+    def _evict(self):
+        while self._total > self.max_bytes:
+            victims = self._db.execute(
+                "SELECT path, size FROM thumbs ORDER BY last_access LIMIT 32"
+            ).fetchall()
+            if not victims:
+                self._total = 0
+                return
+            for path, size in victims:
+                self._db.execute("DELETE FROM thumbs WHERE path = ?", (path,))
+                self._total -= size
+                if self._total <= self.max_bytes:
+                    break
+
+
+_thumbnail_cache = None
+
+
+def get_thumbnail_cache():
+    global _thumbnail_cache
+    if _thumbnail_cache is None:
+        settings = QSettings(ORGANIZATION_NAME, DOMAIN_NAME)
+        max_mb = int(settings.value("thumb_cache_mb", THUMB_CACHE_MB))
+        _thumbnail_cache = ThumbnailCache(
+            os.path.join(get_cache_dir(), "thumbnails.sqlite3"), max_mb * 1024 * 1024
+        )
+    return _thumbnail_cache
+
+
+def image_to_png(image):
+    buf = QByteArray()
+    dev = QBuffer(buf)
+    dev.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(dev, "PNG")
+    dev.close()
+    return bytes(buf)
+
+
+@traced("thumbnail.cache_read")
+def cached_composite_thumbnail(path, layers):
+    """The cached thumbnail if the layers are unchanged, else None. Never decodes."""
+    if is_schema_pack(path):
+        try:
+            return SchemaPack.open(path).thumbnail()  # embedded at pack time
+        except (OSError, ValueError):
+            return None
+    data = get_thumbnail_cache().get(path, layer_signature(layers))
+    if data is None:
+        return None
+    thumb = QImage.fromData(data, "PNG")
+    return None if thumb.isNull() else thumb
+
+
+@traced("thumbnail.decode")
+def read_scaled_image(path, factor):
+    """Decodes an image already scaled by factor (<= 1) where the format allows."""
+    reader = QImageReader(path)
+    size = reader.size()
+    if factor >= 1 or not size.isValid():
+        return reader.read()
+    scaled = QSize(
+        max(1, round(size.width() * factor)),
+        max(1, round(size.height() * factor)),
+    )
+    if reader.supportsOption(QImageIOHandler.ImageOption.ScaledSize):
+        reader.setScaledSize(scaled)
+        return reader.read()
+    # No native scaled decode (PNG): smooth-scaling premultiplied pixels
+    # is about twice as fast as letting QImageReader scale plain ARGB32
+    image = reader.read()
+    if image.isNull():
+        return image
+    return image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied).scaled(
+        scaled,
+        Qt.AspectRatioMode.IgnoreAspectRatio,
+        Qt.TransformationMode.SmoothTransformation,
+    )
+
+
+@traced("thumbnail.composite")
+def composite_thumbnail_image(path, layers):
+    """
+    Composites the schema's layers straight at card resolution (no cache).
+    Every layer is decoded pre-scaled (JPEG uses DCT scaling) and the
+    full-size composite is never allocated. Returns None when unreadable.
+    """
+    files = [os.path.join(path, name) for name, _, _ in layers]
+    base_size = QImageReader(files[0]).size()
+    if not base_size.isValid():
+        return None
+    factor = min(
+        1.0,
+        THUMB_MAX_SIZE / base_size.width(),
+        THUMB_MAX_SIZE / base_size.height(),
+    )
+    target = QSize(
+        max(1, round(base_size.width() * factor)),
+        max(1, round(base_size.height() * factor)),
+    )
+
+    comp = QImage(target, QImage.Format.Format_ARGB32_Premultiplied)
+    comp.fill(Qt.GlobalColor.transparent)
+    decoder = get_pillow_decoder()
+    # owners keeps the shared memory under the decoded images until painted
+    decoded, owners = decoder.scaled(files, factor) if decoder else ([], [])
+    p = QPainter(comp)
+    p.setRenderHint(QPainter.RenderHint.Antialiasing)
+    for i, f in enumerate(files):
+        layer = decoded[i] if decoded else None
+        if layer is None:
+            layer = read_scaled_image(f, factor)
+        if layer.isNull():
+            if i == 0:
+                p.end()
+                return None
+            continue
+        p.drawImage(0, 0, layer)
+    p.end()
+    return comp
+
+
+def render_composite_thumbnail(path, layers=None):
+    """
+    Builds (or fetches from cache) the schema's composite thumbnail.
+    Uses QImage only, so it is safe to call from worker threads.
+    Pass the catalog's layer list to skip listing the directory.
+    """
+    try:
+        if layers is None:
+            layers = list_schema_layers(path)
+
+        if not layers:
+            return None
+
+        # Unchanged layers -> one small read from the on-disk cache
+        thumb = cached_composite_thumbnail(path, layers)
+        if thumb is not None:
+            return thumb
+
+        comp = composite_thumbnail_image(path, layers)
+        if comp is None:
+            return None
+        get_thumbnail_cache().put(path, layer_signature(layers), image_to_png(comp))
+        return comp
+    except Exception:
+        return None
+
+
+# --- BACKGROUND THUMBNAIL LOADER ---
+def thumbnail_levels(image):
+    """
+    Mipmaps of a card thumbnail, smallest first, each fitted into one of
+    the THUMB_LEVELS boxes. Cards draw the nearest level, so zooming the
+    grid never resamples the full thumbnail (which is not kept).
+    """
+    levels = []
+    src = image
+    for edge in reversed(THUMB_LEVELS):
+        if src.width() > edge or src.height() > edge:
+            src = src.scaled(
+                edge,
+                edge,
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation,
+            )
+        if not levels or src.size() != levels[-1].size():
+            levels.append(src)
+    levels.reverse()
+    return levels
+
+
+class _ThumbnailWorker(QRunnable):
+    """Pulls jobs from the loader's priority queue until it runs dry."""
+
+    def __init__(self, loader):
+        super().__init__()
+        self.loader = loader
+
+    def run(self):
+        while True:
+            job = self.loader._next_job()
+            if job is None:
+                return
+            key, layers, pyramid, generation = job
+            if pyramid is not None:
+                # The pyramid owns the level's memory (a pack mapping or a
+                # shared-memory block): keep it referenced while scaling
+                source = pyramid.level_at_least(LAYER_PREVIEW_SIZE)
+                result = source.scaled(
+                    LAYER_PREVIEW_SIZE,
+                    LAYER_PREVIEW_SIZE,
+                    Qt.AspectRatioMode.KeepAspectRatio,
+                    Qt.TransformationMode.SmoothTransformation,
+                )
+                if result.cacheKey() == source.cacheKey():
+                    result = source.copy()  # same size: scaled() shares the data
+            else:
+                image = render_composite_thumbnail(key, layers)
+                result = thumbnail_levels(image) if image is not None else []
+            try:
+                self.loader._jobFinished.emit(key, generation, result)
+            except RuntimeError:
+                return  # loader destroyed (application shutting down)
+
+
+class ThumbnailLoader(QObject):
+    """
+    Renders schema thumbnails on a thread pool.
+    Higher priority requests run first; re-requesting a queued path with a
+    higher priority bumps it. retain() drops queued cards that scrolled out
+    of reach; cancel_all() drops everything still queued and silences
+    results of jobs already running.
+
+    The same queue scales editor layer hover previews (preview()); those are
+    kept in a bounded in-memory LRU until their owner drops them.
+    """
+
+    PREVIEW_PRIORITY = 2  # someone is hovering: ahead of any card
+
+    thumbnailReady = pyqtSignal(str, object)  # path, [QImage] mipmaps (may be empty)
+    previewReady = pyqtSignal(object, QImage)  # preview key, image
+    _jobFinished = pyqtSignal(object, int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(2, QThread.idealThreadCount() - 1))
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._queue = []  # heap of (-priority, seq, key)
+        self._queued = {}  # key -> priority of its live heap entry
+        self._layers = {}  # schema path -> catalog layer list (or None)
+        self._sources = {}  # preview key -> ImagePyramid to scale down
+        self._running = set()
+        self._seq = 0
+        self._workers = 0
+        self.previews = OrderedDict()  # preview key -> QImage, LRU order
+        self.preview_bytes = 0
+        self.preview_max_bytes = PREVIEW_CACHE_MB * 1024 * 1024
+        self._jobFinished.connect(self._on_job_finished)
+
+    def request(self, path, priority=0, layers=None):
+        self._enqueue(path, priority, layers=layers)
+
+    def preview(self, key, pyramid):
+        """
+        Cached hover preview for key, or None after queueing one scaled from
+        the pyramid's level_at_least(LAYER_PREVIEW_SIZE); previewReady
+        follows.
+        """
+        image = self.previews.get(key)
+        if image is not None:
+            self.previews.move_to_end(key)
+            return image
+        self._enqueue(key, self.PREVIEW_PRIORITY, source=pyramid)
+        return None
+
+    def drop_previews(self, keys):
+        for key in keys:
+            image = self.previews.pop(key, None)
+            if image is not None:
+                self.preview_bytes -= image.sizeInBytes()
+
+    def _enqueue(self, key, priority, layers=None, source=None):
+        with self._lock:
+            if key in self._running or self._queued.get(key, -1) >= priority:
+                return
+            self._queued[key] = priority
+            if source is not None:
+                self._sources[key] = source
+            else:
+                self._layers[key] = layers
+            self._seq += 1
+            heapq.heappush(self._queue, (-priority, self._seq, key))
+            spawn = self._workers < self.pool.maxThreadCount()
+            if spawn:
+                self._workers += 1
+        if spawn:
+            self.pool.start(_ThumbnailWorker(self))
+
+    def retain(self, paths):
+        """Drops queued thumbnails not in paths (previews and running jobs stay)."""
+        with self._lock:
+            for key in [k for k in self._queued if k not in paths]:
+                if key not in self._sources:
+                    del self._queued[key]
+                    del self._layers[key]
+            # Stale heap entries (dropped or re-queued keys) go with them
+            self._queue = [e for e in self._queue if self._queued.get(e[2]) == -e[0]]
+            heapq.heapify(self._queue)
+
+    def cancel_all(self):
+        with self._lock:
+            self.generation += 1
+            self._queue.clear()
+            self._queued.clear()
+            self._layers.clear()
+            self._sources.clear()
+            self._running.clear()
+
+    def _next_job(self):
+        with self._lock:
+            while self._queue:
+                neg_priority, _, key = heapq.heappop(self._queue)
+                if self._queued.get(key) == -neg_priority:
+                    del self._queued[key]
+                    self._running.add(key)
+                    return (
+                        key,
+                        self._layers.pop(key, None),
+                        self._sources.pop(key, None),
+                        self.generation,
+                    )
+            self._workers -= 1
+            return None
+
+    def _on_job_finished(self, key, generation, result):
+        if generation != self.generation:
+            return
+        with self._lock:
+            self._running.discard(key)
+        if isinstance(result, QImage):
+            self.drop_previews([key])
+            self.previews[key] = result
+            self.preview_bytes += result.sizeInBytes()
+            while (
+                self.preview_bytes > self.preview_max_bytes and len(self.previews) > 1
+            ):
+                _, old = self.previews.popitem(last=False)
+                self.preview_bytes -= old.sizeInBytes()
+            self.previewReady.emit(key, result)
+        else:
+            self.thumbnailReady.emit(key, result)
+
+
+# --- LIBRARY CATALOG ---
+class CatalogNode:
+    """One scanned directory: its mtime, child folders, layer files and packs."""
+
+    __slots__ = ("mtime_ns", "subdirs", "layers", "packs")
+
+    def __init__(self, mtime_ns, subdirs, layers, packs=()):
+        self.mtime_ns = mtime_ns
+        self.subdirs = subdirs  # naturally sorted child folder names
+        self.layers = layers  # [(name, size, mtime_ns)], naturally sorted
+        self.packs = packs  # [(filename, size, mtime_ns, layer names)]
+
+    @property
+    def kind(self):
+        if self.layers:
+            return "schema"
+        if self.subdirs or self.packs:
+            return "collection"
+        return None
+
+
+class LibraryCatalog:
+    """
+    Persistent snapshot of the library tree under root.
+    refresh() only re-lists directories whose mtime changed since the last
+    scan, so navigation and search never touch the filesystem.
+    """
+
+    VERSION = 2
+
+    def __init__(self, root):
+        self.root = os.path.normpath(root)
+        self.nodes = {}  # absolute dir path -> CatalogNode
+        key = hashlib.sha1(self.root.encode("utf-8", "surrogateescape")).hexdigest()
+        self.cache_file = os.path.join(get_cache_dir(), f"catalog-{key}.json")
+
+    @classmethod
+    def open(cls, root):
+        catalog = cls(root)
+        catalog.load()
+        if catalog.refresh():
+            catalog.save()
+        return catalog
+
+    # --- persistence ---
+    def load(self):
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != self.VERSION or data.get("root") != self.root:
+            return
+        for rel, (mtime, subdirs, layers, packs) in data["nodes"].items():
+            path = self.root if rel == "." else os.path.join(self.root, rel)
+            self.nodes[path] = CatalogNode(
+                mtime, subdirs, [tuple(l) for l in layers], [tuple(p) for p in packs]
+            )
+
+    def save(self):
+        nodes = {
+            os.path.relpath(path, self.root): [
+                n.mtime_ns,
+                n.subdirs,
+                n.layers,
+                n.packs,
+            ]
+            for path, n in self.nodes.items()
+        }
+        tmp = self.cache_file + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": self.VERSION, "root": self.root, "nodes": nodes}, f
+                )
+            os.replace(tmp, self.cache_file)
+        except OSError:
+            pass
+
+    # --- scanning ---
+    @staticmethod
+    def scan_dir(path, mtime_ns):
+        subdirs, layers, packs = [], [], []
+        with TRACER.span("catalog.scan_dir", path=path), os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        subdirs.append(entry.name)
+                    elif entry.name.lower().endswith(VALID_EXTS):
+                        st = entry.stat()
+                        layers.append((entry.name, st.st_size, st.st_mtime_ns))
+                    elif entry.name.lower().endswith(PACK_EXT):
+                        st = entry.stat()
+                        names = read_pack_names(entry.path)
+                        packs.append((entry.name, st.st_size, st.st_mtime_ns, names))
+                except (OSError, ValueError):
+                    continue
+        subdirs.sort(key=natural_sort_key)
+        layers.sort(key=lambda l: natural_sort_key(l[0]))
+        packs.sort(key=lambda p: natural_sort_key(p[0]))
+        return CatalogNode(mtime_ns, subdirs, layers, packs)
+
+    def _visit(self, path, force):
+        """
+        Stats path and re-lists it if its mtime changed (runs on a scan
+        thread). Returns (stat or None, node or None if unlistable, rescanned).
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, None, False
+        node = self.nodes.get(path)
+        if node is not None and node.mtime_ns == st.st_mtime_ns and not force:
+            return st, node, False
+        try:
+            return st, self.scan_dir(path, st.st_mtime_ns), True
+        except OSError:
+            return st, None, False
+
+    @traced("catalog.refresh")
+    def refresh(self, start=None, force=False, on_scanned=None):
+        """
+        Re-scans every directory under start (default: root) whose mtime
+        differs from the catalog; force also re-lists start itself (a layer
+        rewritten in place does not bump its folder's mtime).
+        Directories are stat'ed and listed on SCAN_THREADS threads, since on
+        a network share each call is a round trip. on_scanned(path, node)
+        is called on the calling thread as each directory is classified.
+        Returns the set of re-scanned or removed paths.
+        """
+        start = os.path.normpath(start or self.root)
+        changed = set()
+        seen = set()
+        visited = set()
+        jobs, results = queue.SimpleQueue(), queue.SimpleQueue()
+
+        def scan_worker():
+            while True:
+                job = jobs.get()
+                if job is None:
+                    return
+                try:
+                    results.put((job[0], *self._visit(*job)))
+                except BaseException as e:
+                    results.put((job[0], e, None, False))  # re-raised below
+
+        # Plain threads: an executor's per-call overhead would dominate on
+        # local disks, where the whole walk takes milliseconds
+        workers = [
+            threading.Thread(target=scan_worker, name="catalog-scan", daemon=True)
+            for _ in range(SCAN_THREADS)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            jobs.put((start, force))
+            pending = 1
+            while pending:
+                path, st, node, rescanned = results.get()
+                pending -= 1
+                if isinstance(st, BaseException):
+                    raise st
+                if st is None:
+                    continue
+                if (st.st_dev, st.st_ino) in visited:
+                    continue  # symlink loop
+                visited.add((st.st_dev, st.st_ino))
+                seen.add(path)
+                if node is None:
+                    continue
+                if rescanned:
+                    self.nodes[path] = node
+                    changed.add(path)
+                if on_scanned is not None:
+                    on_scanned(path, node)
+                for d in node.subdirs:
+                    jobs.put((os.path.join(path, d), False))
+                pending += len(node.subdirs)
+        finally:
+            for _ in workers:
+                jobs.put(None)  # not joined: a hung network stat must not block
+
+        # Drop directories that disappeared below start
+        prefix = start + os.sep
+        for path in [p for p in self.nodes if p == start or p.startswith(prefix)]:
+            if path not in seen:
+                del self.nodes[path]
+                changed.add(path)
+        return changed
+
+    def _drop(self, path):
+        """Forgets path and every directory below it; returns the dropped set."""
+        prefix = path + os.sep
+        dropped = {p for p in self.nodes if p == path or p.startswith(prefix)}
+        for p in dropped:
+            del self.nodes[p]
+        return dropped
+
+    @traced("catalog.rescan")
+    def rescan(self, paths):
+        """
+        Re-lists just the given catalogued directories, as reported by the
+        watcher: a folder's own entries changed, not its subtree. Subfolders
+        that appeared are catalogued in full, vanished ones are dropped with
+        everything below them. Returns the set of re-scanned or removed paths.
+        """
+        changed = set()
+        for path in sorted(paths):  # parents first
+            old = self.nodes.get(path)
+            if old is None:
+                continue  # not catalogued, or dropped with its parent above
+            _, node, _ = self._visit(path, True)
+            if node is None:
+                changed |= self._drop(path)
+                continue
+            self.nodes[path] = node
+            changed.add(path)
+            for name in set(old.subdirs).difference(node.subdirs):
+                changed |= self._drop(os.path.join(path, name))
+            for name in set(node.subdirs).difference(old.subdirs):
+                changed |= self.refresh(os.path.join(path, name))
+        return changed
+
+    # --- queries ---
+    def contains(self, path):
+        return os.path.normpath(path) in self.nodes
+
+    def node(self, path):
+        return self.nodes.get(os.path.normpath(path))
+
+    def layers(self, path):
+        """Layer list of a schema folder or pack (None if not catalogued)."""
+        path = os.path.normpath(path)
+        node = self.nodes.get(path)
+        if node is not None:
+            return node.layers
+        parent = self.nodes.get(os.path.dirname(path))
+        if parent is not None:
+            filename = os.path.basename(path)
+            for name, size, mtime, names in parent.packs:
+                if name == filename:
+                    return [(layer, size, mtime) for layer in names]
+        return None
+
+    def is_hidden(self, path):
+        """True for a schema folder converted into a pack beside it."""
+        parent = self.nodes.get(os.path.dirname(path))
+        if parent is None or not parent.packs:
+            return False
+        name = os.path.basename(path)
+        return any(os.path.splitext(p[0])[0] == name for p in parent.packs)
+
+    def children(self, path):
+        """(name, path, kind) for each schema / collection directly in path."""
+        path = os.path.normpath(path)
+        node = self.nodes.get(path)
+        if node is None:
+            return []
+        packs = {os.path.splitext(p[0])[0]: p[0] for p in node.packs}
+        result = []
+        for name in node.subdirs:
+            if name in packs:
+                continue  # converted: the pack stands in for the folder
+            child_path = os.path.join(path, name)
+            child = self.nodes.get(child_path)
+            kind = child.kind if child is not None else None
+            if kind is not None:
+                result.append((name, child_path, kind))
+        if packs:
+            for name, filename in packs.items():
+                result.append((name, os.path.join(path, filename), "schema"))
+            result.sort(key=lambda c: natural_sort_key(c[0]))
+        return result
+
+
+# --- LIVE FILESYSTEM WATCHING ---
+class LibraryWatcher(QObject):
+    """
+    Watches every catalog directory. Change notifications arriving within
+    delay_ms of the first one are coalesced into a single signal.
+    """
+
+    directoriesChanged = pyqtSignal(object)  # set of normalized paths
+
+    def __init__(self, parent=None, delay_ms=300):
+        super().__init__(parent)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+        self.pending = set()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self._flush)
+
+    def reset(self, paths):
+        self.pending.clear()
+        self.timer.stop()
+        current = self.watcher.directories()
+        if current:
+            self.watcher.removePaths(current)
+        self.watch(paths)
+
+    def watch(self, paths):
+        current = set(self.watcher.directories())
+        new = [p for p in paths if p not in current]
+        if new:
+            self.watcher.addPaths(new)
+
+    def _on_directory_changed(self, path):
+        self.pending.add(os.path.normpath(path))
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def _flush(self):
+        paths, self.pending = self.pending, set()
+        self.directoriesChanged.emit(paths)
+
+
+# --- UNIVERSAL SEARCH ---
+def normalize_search_text(text):
+    return text.lower().replace("_", " ").replace("-", " ").strip()
+
+
+class SearchIndex:
+    """
+    In-memory trigram index over schema, collection and layer names.
+    Documents are grouped by the catalog directory they came from, so a
+    changed directory can be re-indexed on its own.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0  # bumped on every change; invalidates narrowing
+        # id -> (key, name, target_path, is_folder, layer_name)
+        self.docs = {}
+        self.grams = {}  # trigram -> set of doc ids
+        self.ids_by_dir = {}  # catalog dir -> [doc ids]
+        self.hidden = set()  # catalog dirs left out: shown as their pack
+        self.sort_keys = {}  # display name -> natural_sort_key, filled lazily
+        self._next_id = 0
+
+    @classmethod
+    @traced("search.index_build")
+    def from_catalog(cls, catalog):
+        index = cls()
+        with index.lock:
+            for path, node in catalog.nodes.items():
+                if catalog.is_hidden(path):
+                    index.hidden.add(path)
+                else:
+                    index._add_dir(path, node)
+        return index
+
+    @staticmethod
+    def trigrams(key):
+        return {key[i : i + 3] for i in range(len(key) - 2)}
+
+    def _add_doc(self, dir_path, name, target, is_folder, layer_name):
+        doc_id = self._next_id
+        self._next_id += 1
+        key = normalize_search_text(layer_name or name)
+        self.docs[doc_id] = (key, name, target, is_folder, layer_name)
+        for gram in self.trigrams(key):
+            self.grams.setdefault(gram, set()).add(doc_id)
+        self.ids_by_dir.setdefault(dir_path, []).append(doc_id)
+
+    def _add_dir(self, path, node):
+        kind = node.kind
+        if kind is None:
+            return
+        name = os.path.basename(path)
+        self._add_doc(path, name, path, kind == "collection", None)
+        for filename, _, _ in node.layers:
+            self._add_doc(path, name, path, False, layer_display_name(filename))
+        for filename, _, _, layers in node.packs:
+            pack_name = os.path.splitext(filename)[0]
+            pack_path = os.path.join(path, filename)
+            self._add_doc(path, pack_name, pack_path, False, None)
+            for layer in layers:
+                label = layer_display_name(layer)
+                self._add_doc(path, pack_name, pack_path, False, label)
+
+    def _remove_dir(self, path):
+        for doc_id in self.ids_by_dir.pop(path, ()):
+            key = self.docs.pop(doc_id)[0]
+            for gram in self.trigrams(key):
+                bucket = self.grams.get(gram)
+                if bucket is not None:
+                    bucket.discard(doc_id)
+                    if not bucket:
+                        del self.grams[gram]
+
+    def update_dirs(self, catalog, paths):
+        """Re-indexes the given catalog directories (removed ones are dropped)."""
+        with self.lock:
+            paths = set(paths)
+            for path in list(paths):
+                # A pack appearing or going away hides or shows its folder
+                node = catalog.nodes.get(path)
+                for filename, _, _, _ in node.packs if node is not None else ():
+                    paths.add(os.path.join(path, os.path.splitext(filename)[0]))
+                paths.update(p for p in self.hidden if os.path.dirname(p) == path)
+            for path in paths:
+                self._remove_dir(path)
+                self.hidden.discard(path)
+                node = catalog.nodes.get(path)
+                if node is None:
+                    continue
+                if catalog.is_hidden(path):
+                    self.hidden.add(path)
+                else:
+                    self._add_dir(path, node)
+            self.version += 1
+
+    @traced("search.query")
+    def search(self, query, previous=None, cancelled=None):
+        """
+        Returns (results, state) or None if cancelled() turned true.
+        results: (name, path, is_folder, layer_name) tuples, one per target
+        folder, ranked exact > prefix > word prefix > substring, folder names
+        before layer names. Pass the returned state back as previous for the
+        next query; if that query only grew, only the last matches are
+        re-checked.
+        """
+        q = normalize_search_text(query)
+        if not q:
+            return [], None
+        word_q = " " + q
+        with self.lock:
+            if (
+                previous is not None
+                and previous[0] == self.version
+                and q.startswith(previous[1])
+            ):
+                candidates = previous[2]
+            elif len(q) >= 3:
+                postings = [self.grams.get(g) for g in self.trigrams(q)]
+                if not all(postings):
+                    candidates = ()
+                else:
+                    postings.sort(key=len)
+                    candidates = postings[0].intersection(*postings[1:])
+            else:
+                candidates = list(self.docs)
+
+            docs = self.docs
+            matches = []
+            best = {}  # target path -> (rank, doc)
+            checked = 0
+            for doc_id in candidates:
+                checked += 1
+                if cancelled is not None and not (checked & 1023) and cancelled():
+                    return None
+                doc = docs.get(doc_id)
+                if doc is None:
+                    continue
+                key = doc[0]
+                if q not in key:
+                    continue
+                matches.append(doc_id)
+                if key == q:
+                    rank = 0
+                elif key.startswith(q):
+                    rank = 2
+                elif word_q in key:
+                    rank = 4
+                else:
+                    rank = 6
+                if doc[4] is not None:
+                    rank += 1  # layer hit ranks below a folder hit of same kind
+                current = best.get(doc[2])
+                if current is None or rank < current[0]:
+                    best[doc[2]] = (rank, doc)
+            state = (self.version, q, matches)
+
+            sort_keys = self.sort_keys
+            ranked = []
+            for rank, doc in best.values():
+                label = doc[4] or doc[1]
+                nat = sort_keys.get(label)
+                if nat is None:
+                    nat = sort_keys[label] = natural_sort_key(label)
+                ranked.append((rank, nat, doc[2], doc))
+
+        ranked.sort(key=lambda r: r[:3])
+        results = [(d[1], d[2], d[3], d[4]) for _, _, _, d in ranked]
+        return results, state
+
+
+class _SearchJob(QRunnable):
+    def __init__(self, engine, query, previous, generation):
+        super().__init__()
+        self.engine = engine
+        self.query = query
+        self.previous = previous
+        self.generation = generation
+
+    def run(self):
+        engine = self.engine
+        out = engine.index.search(
+            self.query,
+            self.previous,
+            cancelled=lambda: engine.generation != self.generation,
+        )
+        if out is not None:
+            try:
+                engine._searchFinished.emit(
+                    self.generation, self.query, out[0], out[1]
+                )
+            except RuntimeError:
+                pass  # engine destroyed (application shutting down)
+
+
+class SearchEngine(QObject):
+    """
+    Debounced, cancellable front end for SearchIndex.
+    submit() restarts the debounce timer; the query runs on a background
+    thread and any newer submit()/cancel() makes it stop and drop its results.
+    """
+
+    resultsReady = pyqtSignal(str, list)
+    _searchFinished = pyqtSignal(int, str, list, object)
+
+    def __init__(self, parent=None, delay_ms=150):
+        super().__init__(parent)
+        self.index = None
+        self.generation = 0
+        self.pending = ""
+        self.last_state = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self._start)
+        self._searchFinished.connect(self._on_finished)
+
+    def set_index(self, index):
+        self.cancel()
+        self.index = index
+        self.last_state = None
+
+    def submit(self, query):
+        self.generation += 1
+        self.pending = query
+        self.timer.start()
+
+    def cancel(self):
+        self.generation += 1
+        self.timer.stop()
+
+    def _start(self):
+        if self.index is None:
+            return
+        self.pool.start(
+            _SearchJob(self, self.pending, self.last_state, self.generation)
+        )
+
+    def _on_finished(self, generation, query, results, state):
+        if generation != self.generation:
+            return
+        self.last_state = state
+        self.resultsReady.emit(query, results)
+
+
+# --- IMAGE PYRAMIDS ---
+def _alpha8_bytes(alpha):
+    """Tightly packed pixel bytes of an Alpha8 image (drops row padding)."""
+    w, bpl = alpha.width(), alpha.bytesPerLine()
+    buf = alpha.constBits().asstring(alpha.sizeInBytes())
+    if bpl == w:
+        return buf
+    return b"".join(buf[y * bpl : y * bpl + w] for y in range(alpha.height()))
+
+
+def _nonzero_span(data, row_len):
+    """(first, last) row of data holding a non-zero byte, or None."""
+    zero = bytes(row_len)
+    rows = len(data) // row_len
+    # Comparing whole rows against zeros is a memcmp per row
+    first = next(
+        (y for y in range(rows) if data[y * row_len : (y + 1) * row_len] != zero),
+        None,
+    )
+    if first is None:
+        return None
+    last = next(
+        y
+        for y in range(rows - 1, first - 1, -1)
+        if data[y * row_len : (y + 1) * row_len] != zero
+    )
+    return first, last
+
+
+@traced("layer.trim_bounds")
+def opaque_bounds(image):
+    """
+    Bounding QRect of the pixels with non-zero alpha, or None when the image
+    is fully transparent. Rows are found by comparing packed alpha rows with
+    zeros, columns by doing the same on the 90° rotated band.
+    """
+    if not image.hasAlphaChannel():
+        return image.rect()
+    alpha = image.convertToFormat(QImage.Format.Format_Alpha8)
+    w = alpha.width()
+    data = _alpha8_bytes(alpha)
+    rows = _nonzero_span(data, w)
+    if rows is None:
+        return None
+    top, bottom = rows
+    if data[top * w] and data[top * w + w - 1]:
+        return QRect(0, top, w, bottom - top + 1)  # e.g. opaque backgrounds
+    band = alpha.copy(0, top, w, bottom - top + 1).transformed(QTransform().rotate(90))
+    if band.format() != QImage.Format.Format_Alpha8:
+        band = band.convertToFormat(QImage.Format.Format_Alpha8)
+    left, right = _nonzero_span(_alpha8_bytes(band), band.width())
+    return QRect(left, top, right - left + 1, bottom - top + 1)
+
+
+class ImagePyramid:
+    """
+    A decoded layer at successive half resolutions: levels[0] is full size,
+    each next level halves it until it fits in one tile. QImage only, so it
+    can be built on a worker thread.
+    The image may be trimmed to its opaque bounds; offset is then where it
+    sits on the canvas_size canvas.
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self, image, offset=None, canvas_size=None):
+        self.key = next(self._ids)  # unique tile-cache namespace
+        self.offset = offset or QPoint(0, 0)
+        self.canvas_size = canvas_size or image.size()
+        self.source = None  # owner of the level memory, if borrowed
+        self.mapped = False  # levels point into a memory-mapped file
+        self._pick_mask = None
+        if image.format() != QImage.Format.Format_ARGB32_Premultiplied:
+            image = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+        self.levels = [image]
+        while max(image.width(), image.height()) > TILE_SIZE:
+            image = image.scaled(
+                max(1, image.width() // 2),
+                max(1, image.height() // 2),
+                Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.SmoothTransformation,
+            )
+            self.levels.append(image)
+
+    @classmethod
+    def from_levels(cls, levels, offset, canvas_size, source=None, mapped=False):
+        """Pyramid over ready-made levels; source keeps their memory alive."""
+        pyramid = cls.__new__(cls)
+        pyramid.key = next(cls._ids)
+        pyramid.offset = offset
+        pyramid.canvas_size = canvas_size
+        pyramid.source = source
+        pyramid.mapped = mapped
+        pyramid._pick_mask = None
+        pyramid.levels = levels
+        return pyramid
+
+    @classmethod
+    def from_file(cls, path, trim=True):
+        image = QImage(path)
+        if image.isNull():
+            return None
+        return cls.trimmed(image) if trim else cls(image)
+
+    @classmethod
+    def trimmed(cls, image):
+        """Pyramid of the image cropped to its opaque bounding box."""
+        canvas = image.size()
+        bounds = opaque_bounds(image)
+        if bounds is None:
+            empty = QImage(1, 1, QImage.Format.Format_ARGB32_Premultiplied)
+            empty.fill(Qt.GlobalColor.transparent)
+            return cls(empty, QPoint(0, 0), canvas)
+        if bounds != image.rect():
+            image = image.copy(bounds)
+        return cls(image, bounds.topLeft(), canvas)
+
+    @property
+    def width(self):
+        return self.levels[0].width()
+
+    @property
+    def height(self):
+        return self.levels[0].height()
+
+    @property
+    def nbytes(self):
+        return sum(level.sizeInBytes() for level in self.levels)
+
+    def level_for_scale(self, scale):
+        """Coarsest level that still has at least one texel per device pixel."""
+        if scale <= 0:
+            return len(self.levels) - 1
+        level = int(math.floor(math.log2(1.0 / scale))) if scale < 1 else 0
+        return max(0, min(level, len(self.levels) - 1))
+
+    def level_at_least(self, size):
+        """Smallest level whose longer edge is still >= size (for previews)."""
+        for level in reversed(self.levels):
+            if max(level.width(), level.height()) >= size:
+                return level
+        return self.levels[0]
+
+    def pick_mask(self):
+        """The layer's PickMask, built on first use (call it off the GUI thread)."""
+        if self._pick_mask is None:
+            self._pick_mask = PickMask.from_pyramid(self)
+        return self._pick_mask
+
+
+_PICK_BITS = bytes(ord("1") if a >= PICK_ALPHA else ord("0") for a in range(256))
+
+
+class PickMask:
+    """
+    Where a layer is opaque, on a coarse grid over the whole canvas: one
+    Python int per grid row of the layer's bounds, bit x set when cell
+    x0 + x is covered. Cells are averaged, so thin structures still count.
+    """
+
+    __slots__ = ("cell", "x0", "y0", "rows")
+
+    def __init__(self, cell, x0, y0, rows):
+        self.cell = cell  # canvas pixels per grid cell
+        self.x0 = x0
+        self.y0 = y0
+        self.rows = rows
+
+    @classmethod
+    def from_pyramid(cls, pyramid):
+        canvas = pyramid.canvas_size
+        longest = max(canvas.width(), canvas.height(), 1)
+        cell = max(1, math.ceil(longest / PICK_MASK_SIZE))
+        left, top = pyramid.offset.x(), pyramid.offset.y()
+        x0, y0 = left // cell, top // cell
+        w = -(-(left + pyramid.width) // cell) - x0
+        h = -(-(top + pyramid.height) // cell) - y0
+        grid = QImage(w, h, QImage.Format.Format_ARGB32_Premultiplied)
+        grid.fill(Qt.GlobalColor.transparent)
+        p = QPainter(grid)
+        p.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        target = QRectF(
+            (left - x0 * cell) / cell,
+            (top - y0 * cell) / cell,
+            pyramid.width / cell,
+            pyramid.height / cell,
+        )
+        edge = max(target.width(), target.height())
+        p.drawImage(target, pyramid.level_at_least(math.ceil(edge)))
+        p.end()
+        data = _alpha8_bytes(grid.convertToFormat(QImage.Format.Format_Alpha8))
+        # '0'/'1' per cell, reversed so that bit x is cell x
+        rows = [
+            int(data[y * w : (y + 1) * w].translate(_PICK_BITS)[::-1], 2)
+            for y in range(h)
+        ]
+        return cls(cell, x0, y0, rows)
+
+    def hit(self, x, y):
+        """True if canvas point (x, y) lies on an opaque cell."""
+        row = int(y // self.cell) - self.y0
+        col = int(x // self.cell) - self.x0
+        if row < 0 or col < 0 or row >= len(self.rows):
+            return False
+        return (self.rows[row] >> col) & 1 == 1
+
+
+class LayerPickIndex:
+    """
+    Topmost visible, opaque enough layer at a canvas point, answered from
+    the layers' PickMasks in microseconds (no pixel is read).
+    """
+
+    def __init__(self):
+        self.entries = []  # (index, mask, state), topmost first
+
+    def add(self, index, mask, state):
+        """state: the editor's live [visible, opacity] list for the layer."""
+        bisect.insort(self.entries, (index, mask, state), key=lambda e: -e[0])
+
+    def clear(self):
+        self.entries = []
+
+    def pick(self, x, y):
+        """Layer index under (x, y), or -1."""
+        for index, mask, (visible, opacity) in self.entries:
+            if visible and opacity >= PICK_MIN_OPACITY and mask.hit(x, y):
+                return index
+        return -1
+
+
+class DecodedLayerCache:
+    """
+    Thread-safe LRU of decoded layers (ImagePyramid) keyed by
+    (path, size, mtime_ns), bounded by a byte budget. Reopening a recently
+    viewed schema skips decoding entirely.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items = OrderedDict()  # key -> (pyramid, nbytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def contains(self, key):
+        """Membership test that counts no hit or miss and keeps the LRU order."""
+        with self._lock:
+            return key in self._items
+
+    def put(self, key, pyramid, keep=None):
+        """
+        Stores pyramid, evicting least recently used entries. Keys in keep
+        are never evicted; if the pyramid only fits by dropping them it is
+        not stored (returns False).
+        """
+        size = pyramid.nbytes
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if keep is not None:
+                pinned = sum(n for k, (_, n) in self._items.items() if k in keep)
+                if pinned + size > self.max_bytes:
+                    return False
+            self._items[key] = (pyramid, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                victim = next(
+                    k
+                    for k in self._items
+                    if k != key and (keep is None or k not in keep)
+                )
+                self.bytes -= self._items.pop(victim)[1]
+                self.evictions += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_layer_cache = None
+
+
+def get_layer_cache():
+    global _layer_cache
+    if _layer_cache is None:
+        settings = QSettings(ORGANIZATION_NAME, DOMAIN_NAME)
+        max_mb = int(settings.value("layer_cache_mb", LAYER_CACHE_MB))
+        _layer_cache = DecodedLayerCache(max_mb * 1024 * 1024)
+    return _layer_cache
+
+
+# --- PACKED SCHEMAS ---
+PACK_MAGIC = b"ANATOPK1"
+PACK_TRAILER = struct.Struct("<QI8s")  # header offset, header length, magic
+PACK_ALIGN = 64  # pixel blobs start on cache-line boundaries
+PACK_FORMAT = QImage.Format.Format_ARGB32_Premultiplied
+
+
+def read_pack_header(f):
+    """Parses the JSON header of an open pack file (ValueError if not a pack)."""
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    if end < len(PACK_MAGIC) + PACK_TRAILER.size:
+        raise ValueError("not a schema pack")
+    f.seek(end - PACK_TRAILER.size)
+    offset, length, magic = PACK_TRAILER.unpack(f.read(PACK_TRAILER.size))
+    if magic != PACK_MAGIC or offset + length > end - PACK_TRAILER.size:
+        raise ValueError("not a schema pack")
+    f.seek(offset)
+    header = json.loads(f.read(length).decode("utf-8"))
+    if header.get("version") != 1 or header.get("byteorder") != sys.byteorder:
+        raise ValueError("unsupported schema pack")
+    return header
+
+
+def read_pack_names(path):
+    """Layer names of a pack in z-order; reads only the header."""
+    with open(path, "rb") as f:
+        return [layer["name"] for layer in read_pack_header(f)["layers"]]
+
+
+class SchemaPack:
+    """
+    A packed schema file: trimmed layer pyramids stored as raw premultiplied
+    pixels (or zlib-compressed), plus an embedded card thumbnail.
+
+    Layout: magic, 64-byte aligned blobs, JSON header, trailer. The file is
+    memory-mapped, so raw levels become QImages over the mapping without a
+    decode or a copy; the pages are read on first paint. Packs are replaced
+    atomically (never rewritten in place), so an open mapping stays valid.
+    """
+
+    CACHE_SIZE = 8  # open packs kept mapped
+    _cache = OrderedDict()  # path -> SchemaPack
+    _cache_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.stamp = (st.st_size, st.st_mtime_ns)
+            header = read_pack_header(f)
+            # Copy-on-write: a stray write to a QImage never reaches the file
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        self.canvas_size = QSize(*header["canvas"])
+        self.entries = {layer["name"]: layer for layer in header["layers"]}
+        self.names = [layer["name"] for layer in header["layers"]]
+        self.thumbnail_blob = header.get("thumbnail")
+
+    @classmethod
+    def open(cls, path):
+        """Shared, still-current SchemaPack for path (thread-safe)."""
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns)
+        with cls._cache_lock:
+            pack = cls._cache.get(path)
+            if pack is not None and pack.stamp == stamp:
+                cls._cache.move_to_end(path)
+                return pack
+        pack = cls(path)
+        with cls._cache_lock:
+            cls._cache[path] = pack
+            cls._cache.move_to_end(path)
+            while len(cls._cache) > cls.CACHE_SIZE:
+                cls._cache.popitem(last=False)  # unmapped once its pyramids go
+        return pack
+
+    def _blob(self, offset, length):
+        if offset < 0 or offset + length > len(self.map):
+            raise ValueError("truncated schema pack")
+        return memoryview(self.map)[offset : offset + length]
+
+    def _level(self, width, height, stride, codec, offset, length):
+        if codec == "raw":
+            if length < stride * height:
+                raise ValueError("truncated schema pack")
+            # Borrows the mapping: the pyramid keeps this pack alive
+            ptr = sip.voidptr(self._blob(offset, length))
+            return QImage(ptr, width, height, stride, PACK_FORMAT)
+        data = zlib.decompress(self._blob(offset, length))
+        return QImage(data, width, height, stride, PACK_FORMAT).copy()
+
+    def pyramid(self, name):
+        """The layer's ImagePyramid (KeyError if the pack has no such layer)."""
+        entry = self.entries[name]
+        levels = [self._level(*level) for level in entry["levels"]]
+        return ImagePyramid.from_levels(
+            levels,
+            QPoint(*entry["offset"]),
+            self.canvas_size,
+            source=self,
+            mapped=all(level[3] == "raw" for level in entry["levels"]),
+        )
+
+    def thumbnail(self):
+        if not self.thumbnail_blob:
+            return None
+        thumb = QImage.fromData(bytes(self._blob(*self.thumbnail_blob)), "PNG")
+        return None if thumb.isNull() else thumb
+
+
+def load_layer_pyramid(path):
+    """
+    Trimmed pyramid of a layer file, or of a packed layer when path is
+    pack path + layer name. None when unreadable.
+    """
+    pack_path = os.path.dirname(path)
+    if is_schema_pack(pack_path):
+        try:
+            return SchemaPack.open(pack_path).pyramid(os.path.basename(path))
+        except (OSError, ValueError, KeyError):
+            return None
+    decoder = get_pillow_decoder()
+    if decoder is not None:
+        pyramid = decoder.pyramid(path)
+        if pyramid is not None:
+            return pyramid
+    return ImagePyramid.from_file(path)  # also formats only Qt can read
+
+
+def _image_bytes(image):
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    return bytes(ptr)
+
+
+def write_schema_pack(folder, dest, compress=False):
+    """
+    Packs a schema folder into dest. Layers are decoded, trimmed and written
+    one at a time, so memory stays at one layer's pyramid. Raw levels are
+    mapped straight into the viewer; compress trades that for zlib (level 1)
+    at about a third of the size. Returns the number of layers.
+    """
+    layers = list_layer_files(folder)
+    if not layers:
+        raise ValueError(f"no layers in {folder}")
+    header = {"version": 1, "byteorder": sys.byteorder, "layers": []}
+    tmp = dest + ".tmp"
+    thumb = painter = None
+    try:
+        with open(tmp, "wb") as f:
+            f.write(PACK_MAGIC)
+
+            def put(data):
+                f.write(b"\0" * (-f.tell() % PACK_ALIGN))
+                offset = f.tell()
+                f.write(data)
+                return [offset, len(data)]
+
+            for name, _, _ in layers:
+                pyramid = ImagePyramid.from_file(os.path.join(folder, name))
+                if pyramid is None:
+                    raise ValueError(f"unreadable layer: {name}")
+                if thumb is None:
+                    canvas = pyramid.canvas_size
+                    header["canvas"] = [canvas.width(), canvas.height()]
+                    factor = min(
+                        1.0,
+                        THUMB_MAX_SIZE / canvas.width(),
+                        THUMB_MAX_SIZE / canvas.height(),
+                    )
+                    thumb = QImage(
+                        max(1, round(canvas.width() * factor)),
+                        max(1, round(canvas.height() * factor)),
+                        QImage.Format.Format_ARGB32_Premultiplied,
+                    )
+                    thumb.fill(Qt.GlobalColor.transparent)
+                    painter = QPainter(thumb)
+                    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+                target = QRectF(
+                    pyramid.offset.x() * factor,
+                    pyramid.offset.y() * factor,
+                    pyramid.width * factor,
+                    pyramid.height * factor,
+                )
+                edge = max(target.width(), target.height())
+                painter.drawImage(target, pyramid.level_at_least(math.ceil(edge)))
+
+                levels = []
+                for level in pyramid.levels:
+                    data, codec = _image_bytes(level), "raw"
+                    if compress:
+                        data, codec = zlib.compress(data, 1), "zlib"
+                    levels.append(
+                        [level.width(), level.height(), level.bytesPerLine(), codec]
+                        + put(data)
+                    )
+                header["layers"].append(
+                    {
+                        "name": name,
+                        "offset": [pyramid.offset.x(), pyramid.offset.y()],
+                        "levels": levels,
+                    }
+                )
+                del pyramid  # one decoded layer at a time
+
+            painter.end()
+            painter = None
+            header["thumbnail"] = put(image_to_png(thumb))
+            data = json.dumps(header).encode("utf-8")
+            offset = f.tell()
+            f.write(data)
+            f.write(PACK_TRAILER.pack(offset, len(data), PACK_MAGIC))
+        os.replace(tmp, dest)
+    except BaseException:
+        if painter is not None:
+            painter.end()
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+    return len(layers)
+
+
+# --- PROCESS-POOL DECODING ---
+# 8-bit modes only: Pillow clips 16-bit / float grey when converting to
+# RGBA, so those (and CMYK, YCbCr...) stay with Qt
+PIL_MODES = ("1", "L", "LA", "P", "RGB", "RGBA")
+
+
+def _pil_init():
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = None  # large schemas are expected, not bombs
+
+
+def _pil_decode(path, factor=None):
+    """
+    Decodes path with Pillow into premultiplied RGBa images: the trimmed
+    pyramid levels as ImagePyramid builds them, or with factor (<= 1) one
+    image pre-scaled by it. Returns (canvas (w, h), offset (x, y), images);
+    ValueError for modes outside PIL_MODES.
+    """
+    from PIL import Image
+
+    with Image.open(path) as image:
+        if image.mode not in PIL_MODES:
+            raise ValueError(f"unsupported mode: {image.mode}")
+        canvas = image.size
+        if factor is not None:
+            canvas = (
+                max(1, round(image.width * factor)),
+                max(1, round(image.height * factor)),
+            )
+            image.draft(None, canvas)  # JPEG: DCT-scaled decode
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+        image.load()
+    if factor is not None:
+        image = image.convert("RGBa")
+        if image.size != canvas:
+            image = image.resize(canvas, Image.Resampling.BOX, reducing_gap=2.0)
+        return canvas, (0, 0), [image]
+
+    bounds = image.getchannel("A").getbbox()
+    if bounds is None:
+        return canvas, (0, 0), [Image.new("RGBa", (1, 1))]
+    if bounds != (0, 0) + canvas:
+        image = image.crop(bounds)
+    image = image.convert("RGBa")
+    levels = [image]
+    while max(image.size) > TILE_SIZE:
+        width, height = max(1, image.width // 2), max(1, image.height // 2)
+        if min(image.size) > 1:
+            image = image.reduce(2, (0, 0, width * 2, height * 2))  # 2x2 means
+        else:
+            image = image.resize((width, height), Image.Resampling.BOX)
+        levels.append(image)
+    return canvas, bounds[:2], levels
+
+
+def _decode_to_shared(path, factor):
+    """
+    Pool task: decodes path into a new shared-memory block, levels laid out
+    as ARGB32_Premultiplied rows at PACK_ALIGN offsets. Returns (block name,
+    canvas, offset, [(w, h, block offset)]), or None if Pillow cannot read it.
+    """
+    from multiprocessing import shared_memory
+
+    try:
+        canvas, offset, images = _pil_decode(path, factor)
+    except Exception:  # Pillow raises many types for unreadable files
+        return None
+    shapes, size = [], 0
+    for image in images:
+        size += -size % PACK_ALIGN
+        shapes.append((image.width, image.height, size))
+        size += image.width * image.height * 4
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        for image, (width, height, start) in zip(images, shapes):
+            end = start + width * height * 4
+            shm.buf[start:end] = image.tobytes("raw", "BGRa")  # = ARGB32 in LE
+    except BaseException:
+        shm.unlink()
+        raise
+    finally:
+        shm.close()
+    return shm.name, canvas, offset, shapes
+
+
+class PillowDecoder:
+    """
+    Optional decode backend: Pillow on a pool of worker processes, so
+    decoding (TIFF, WebP, alpha conversion) scales past the GUI process's
+    core. Pixels come back in a shared-memory block that the QImages point
+    into, without a copy. With processes=0 it decodes inline (--warm
+    workers are already one process per core).
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.pool = None
+        self.pool_lock = threading.Lock()
+        if processes > 0:
+            self.pool = self._start_pool()
+        else:
+            _pil_init()
+
+    def _start_pool(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        return ProcessPoolExecutor(
+            self.processes,
+            multiprocessing.get_context("spawn"),
+            initializer=_pil_init,
+        )
+
+    def _restart_pool(self, pool):
+        """Replaces a broken pool (a worker died); its callers fall back to Qt."""
+        with self.pool_lock:
+            if self.pool is pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = self._start_pool()
+
+    @staticmethod
+    def available():
+        import importlib.util
+
+        # Worker pixels are written as BGRa, which is ARGB32 on little-endian.
+        # POSIX only: a Windows block is freed once the worker closes it.
+        return (
+            os.name == "posix"
+            and sys.byteorder == "little"
+            and importlib.util.find_spec("PIL") is not None
+        )
+
+    def _decode(self, paths, factor):
+        """[(canvas, offset, levels, owner) or None] per path, decoded in parallel."""
+        from concurrent.futures.process import BrokenProcessPool
+
+        pool = self.pool
+        if pool is None:
+            return [self._decode_inline(path, factor) for path in paths]
+        try:
+            futures = [pool.submit(_decode_to_shared, path, factor) for path in paths]
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            return [None] * len(paths)
+        except RuntimeError:
+            return [None] * len(paths)  # shutting down
+        return [self._attach(pool, future) for future in futures]
+
+    @staticmethod
+    def _decode_inline(path, factor):
+        try:
+            canvas, offset, images = _pil_decode(path, factor)
+        except Exception:
+            return None
+        levels = [
+            QImage(
+                image.tobytes("raw", "BGRa"),
+                image.width,
+                image.height,
+                image.width * 4,
+                PACK_FORMAT,
+            ).copy()
+            for image in images
+        ]
+        return QSize(*canvas), QPoint(*offset), levels, None
+
+    def _attach(self, pool, future):
+        from concurrent.futures.process import BrokenProcessPool
+        from multiprocessing import shared_memory
+
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            return None
+        except Exception:
+            return None
+        if result is None:
+            return None
+        name, canvas, offset, shapes = result
+        try:
+            shm = shared_memory.SharedMemory(name)
+        except OSError:
+            return None
+        with contextlib.suppress(OSError):
+            shm.unlink()  # the mapping stays until shm (the levels' owner) is freed
+        levels = [
+            QImage(
+                sip.voidptr(shm.buf[start : start + width * height * 4]),
+                width,
+                height,
+                width * 4,
+                PACK_FORMAT,
+            )
+            for width, height, start in shapes
+        ]
+        return QSize(*canvas), QPoint(*offset), levels, shm
+
+    def pyramid(self, path):
+        """Trimmed ImagePyramid of a layer file, or None if Pillow cannot read it."""
+        decoded = self._decode([path], None)[0]
+        if decoded is None:
+            return None
+        canvas, offset, levels, owner = decoded
+        return ImagePyramid.from_levels(levels, offset, canvas, source=owner)
+
+    def scaled(self, paths, factor):
+        """
+        ([QImage or None] per path, owners): every file decoded pre-scaled by
+        factor, in parallel. Keep owners alive while the images are used.
+        """
+        decoded = self._decode(paths, factor)
+        images = [None if d is None else d[2][0] for d in decoded]
+        return images, [d[3] for d in decoded if d is not None]
+
+
+_pillow_decoder = None
+_pillow_decoder_lock = threading.Lock()
+
+
+def get_pillow_decoder():
+    """The shared PillowDecoder, or None to decode with Qt (the default)."""
+    global _pillow_decoder
+    with _pillow_decoder_lock:
+        if _pillow_decoder is None:
+            settings = QSettings(ORGANIZATION_NAME, DOMAIN_NAME)
+            processes = int(settings.value("decode_processes", DECODE_PROCESSES))
+            _pillow_decoder = False
+            if processes > 0 and PillowDecoder.available():
+                _pillow_decoder = PillowDecoder(processes)
+    return _pillow_decoder or None
+
+
+# --- BACKGROUND SCHEMA LOADER ---
+class _LayerDecodeJob(QRunnable):
+    def __init__(self, loader, generation, index, path, cache_key):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.index = index
+        self.path = path
+        self.cache_key = cache_key
+
+    def run(self):
+        if self.loader.generation != self.generation:
+            return
+        cache = get_layer_cache()
+        pyramid = cache.get(self.cache_key)
+        if pyramid is None:
+            with TRACER.span("layer.decode", path=self.path, index=self.index):
+                pyramid = load_layer_pyramid(self.path)
+            if pyramid is not None and not pyramid.mapped:
+                cache.put(self.cache_key, pyramid)
+        if self.loader.generation != self.generation:
+            return  # cancelled while decoding; let the pyramid go
+        if pyramid is not None:
+            pyramid.pick_mask()
+        try:
+            self.loader._layerDecoded.emit(self.generation, self.index, pyramid)
+        except RuntimeError:
+            pass  # loader destroyed (application shutting down)
+
+
+class SchemaLoader(QObject):
+    """
+    Decodes a schema's layers on a thread pool, one job per layer, in
+    z-order. Each layer is reported as soon as it is ready; cancel() (or a
+    new load()) drops queued jobs and silences the ones already running.
+    """
+
+    layerReady = pyqtSignal(int, object)  # index into the file list, ImagePyramid
+    layerFailed = pyqtSignal(int)
+    finished = pyqtSignal()
+    _layerDecoded = pyqtSignal(int, int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(2, QThread.idealThreadCount() - 1))
+        self.generation = 0
+        self.remaining = 0
+        self._layerDecoded.connect(self._on_layer_decoded)
+
+    def load(self, folder, layers):
+        """layers: [(filename, size, mtime_ns)] in z-order (folder may be a pack)."""
+        self.cancel()
+        get_layer_cache()  # create the shared cache on the GUI thread
+        get_pillow_decoder()
+        self.remaining = len(layers)
+        for i, (filename, size, mtime) in enumerate(layers):
+            path = os.path.join(folder, filename)
+            self.pool.start(
+                _LayerDecodeJob(self, self.generation, i, path, (path, size, mtime))
+            )
+        if not layers:
+            self.finished.emit()
+
+    def cancel(self):
+        self.generation += 1
+        self.remaining = 0
+        self.pool.clear()
+
+    def is_loading(self):
+        return self.remaining > 0
+
+    def _on_layer_decoded(self, generation, index, pyramid):
+        if generation != self.generation:
+            return
+        self.remaining -= 1
+        if pyramid is None:
+            self.layerFailed.emit(index)
+        else:
+            self.layerReady.emit(index, pyramid)
+        if self.remaining == 0:
+            self.finished.emit()
+
+
+class _PrefetchJob(QRunnable):
+    def __init__(self, prefetcher, generation, path, cache_key, keep):
+        super().__init__()
+        self.prefetcher = prefetcher
+        self.generation = generation
+        self.path = path
+        self.cache_key = cache_key
+        self.keep = keep
+
+    def run(self):
+        if self.prefetcher.generation != self.generation:
+            return
+        cache = get_layer_cache()
+        if cache.contains(self.cache_key):  # a probe, not a hit or miss
+            return
+        pyramid = load_layer_pyramid(self.path)
+        if pyramid is None or self.prefetcher.generation != self.generation:
+            return
+        if pyramid.mapped:
+            return  # nothing to decode: opening the pack again is free
+        # Evicts older entries, but never what is on screen or being prefetched
+        if not cache.put(self.cache_key, pyramid, keep=self.keep):
+            try:
+                self.prefetcher._cacheFull.emit(self.generation)
+            except RuntimeError:
+                pass  # prefetcher destroyed (application shutting down)
+
+
+class SchemaPrefetcher(QObject):
+    """
+    Speculatively decodes whole schemas into the DecodedLayerCache on a
+    single low-priority thread, so stepping to them is instant.
+    """
+
+    _cacheFull = pyqtSignal(int)  # generation
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        if hasattr(self.pool, "setThreadPriority"):  # Qt >= 6.2
+            self.pool.setThreadPriority(QThread.Priority.LowPriority)
+        self.generation = 0
+        self._cacheFull.connect(self._on_cache_full)
+
+    def prefetch(self, schemas, keep=()):
+        """
+        schemas: [(folder, layers)], most likely next first. keep: cache
+        keys of the schema on screen, never evicted for a prefetch.
+        """
+        self.cancel()
+        get_layer_cache()
+        jobs = [
+            (os.path.join(folder, filename), size, mtime)
+            for folder, layers in schemas
+            for filename, size, mtime in layers
+        ]
+        keep = frozenset(keep).union(jobs)
+        for key in jobs:
+            self.pool.start(_PrefetchJob(self, self.generation, key[0], key, keep))
+
+    def cancel(self):
+        self.generation += 1
+        self.pool.clear()
+
+    def _on_cache_full(self, generation):
+        if generation == self.generation:
+            self.cancel()  # the rest would not fit either
+
+
+# --- LAYER FLATTENING ---
+@traced("flatten.composite")
+def composite_layers(members, level, canvas_size):
+    """
+    Flattens [(pyramid, opacity)] (bottom to top) into one QImage at
+    1 / 2**level of the canvas size. QImage only: safe on worker threads.
+    """
+    f = 2**level
+    out = QImage(
+        max(1, math.ceil(canvas_size.width() / f)),
+        max(1, math.ceil(canvas_size.height() / f)),
+        QImage.Format.Format_ARGB32_Premultiplied,
+    )
+    out.fill(Qt.GlobalColor.transparent)
+    p = QPainter(out)
+    p.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+    for pyramid, opacity in members:
+        image = pyramid.levels[min(level, len(pyramid.levels) - 1)]
+        p.setOpacity(opacity)
+        p.drawImage(
+            QRectF(
+                pyramid.offset.x() / f,
+                pyramid.offset.y() / f,
+                pyramid.width / f,
+                pyramid.height / f,
+            ),
+            image,
+        )
+    p.end()
+    return out
+
+
+class _FlattenJob(QRunnable):
+    def __init__(self, flattener, generation, key, level, members, canvas_size):
+        super().__init__()
+        self.flattener = flattener
+        self.generation = generation
+        self.key = key
+        self.level = level
+        self.members = members
+        self.canvas_size = canvas_size
+
+    def run(self):
+        if self.flattener.generation != self.generation:
+            return
+        pyramid = None
+        # Superseded while queued (e.g. each wheel step over an opacity
+        # slider queues a build): report it without compositing
+        if self.key in self.flattener.wanted:
+            pyramid = ImagePyramid(
+                composite_layers(self.members, self.level, self.canvas_size)
+            )
+        try:
+            self.flattener._composited.emit(
+                self.generation, self.key, self.level, pyramid
+            )
+        except RuntimeError:
+            pass  # flattener destroyed (application shutting down)
+
+
+class LayerFlattener(QObject):
+    """
+    Keeps flattened composites of static layers so each frame blends at
+    most three surfaces: everything below the layer being edited, that
+    layer, and everything above it. With no edit in progress all layers
+    collapse into one composite, so panning draws a single surface.
+
+    Composites are keyed by their members' (index, visible, opacity), built
+    off the GUI thread at the resolution the view needs, and only rebuilt
+    when those inputs change or the view zooms in past their resolution.
+    Until a valid composite exists the plain per-layer items are shown.
+    """
+
+    _composited = pyqtSignal(int, object, int, object)
+
+    def __init__(self, scene, view, parent=None):
+        super().__init__(parent)
+        self.scene = scene
+        self.view = view
+        self.items = {}  # layer index -> TiledLayerItem
+        self.state = {}  # layer index -> [visible, opacity] as set by the user
+        self.canvas_size = QSize()
+        self.enabled = False
+        self.focus = None  # layer being edited
+        self.last_focus = None
+        self.composites = {}  # group key -> (level, TiledLayerItem)
+        self.pending = set()
+        self.wanted = frozenset()  # group keys the current state can show
+        self.generation = 0
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.view_timer = QTimer(self)
+        self.view_timer.setSingleShot(True)
+        self.view_timer.setInterval(150)
+        self.view_timer.timeout.connect(self.update)
+        self._composited.connect(self._on_composited)
+
+    def set_layers(self, items, state, canvas_size):
+        self.reset()
+        self.items = items
+        self.state = state
+        self.canvas_size = canvas_size
+        self.enabled = len(items) >= 3 and not canvas_size.isEmpty()
+        self.update()
+
+    def reset(self):
+        self.generation += 1
+        self.pool.clear()
+        self.view_timer.stop()
+        for _, item in self.composites.values():
+            item.release_tiles()
+            if item.scene() is not None:
+                self.scene.removeItem(item)
+        self.composites = {}
+        self.pending = set()
+        self.wanted = frozenset()
+        self.items = {}
+        self.state = {}
+        self.enabled = False
+        self.focus = self.last_focus = None
+
+    # --- inputs ---
+    def begin_edit(self, index):
+        self.focus = self.last_focus = index
+        self.update()
+
+    def end_edit(self):
+        self.focus = None
+        self.update()
+
+    def view_changed(self):
+        if self.enabled:
+            self.view_timer.start()
+
+    # --- resolution ---
+    def needed_level(self):
+        scale = self.view.transform().m11()
+        if scale >= 1 or scale <= 0:
+            return 0
+        return int(math.floor(math.log2(1.0 / scale)))
+
+    def min_level(self):
+        longest = max(self.canvas_size.width(), self.canvas_size.height())
+        return max(0, math.ceil(math.log2(max(1, longest) / FLATTEN_MAX_PX)))
+
+    # --- composites ---
+    def group_key(self, group):
+        return tuple((i, self.state[i][0], round(self.state[i][1], 3)) for i in group)
+
+    def configurations(self):
+        """Acceptable group splits, preferred first."""
+        order = sorted(self.items)
+
+        def split(f):
+            below = [i for i in order if i < f]
+            above = [i for i in order if i > f]
+            return [g for g in (below, above) if g]
+
+        if self.focus is not None:
+            return [split(self.focus)]
+        configs = [[order]]
+        if self.last_focus is not None:
+            configs.append(split(self.last_focus))
+        return configs
+
+    def update(self):
+        if not self.enabled:
+            return
+        needed = self.needed_level()
+        if needed < self.min_level():
+            # Zoomed in past the composite budget: tiles of single layers
+            # are cheaper here (only a few of them intersect the view)
+            self.apply([])
+            return
+        configs = self.configurations()
+        wanted = set()
+        chosen = []
+        for groups in configs:
+            keys = [self.group_key(g) for g in groups]
+            wanted.update(keys)
+            if not chosen and all(k in self.composites for k in keys):
+                chosen = list(zip(groups, keys))
+        self.wanted = frozenset(wanted)  # read by queued _FlattenJobs
+        for group in configs[0]:
+            key = self.group_key(group)
+            have = self.composites.get(key)
+            if (have is None or have[0] > needed) and key not in self.pending:
+                self.request(key, group, needed)
+        self.apply(chosen)
+        for key in [k for k in self.composites if k not in wanted]:
+            item = self.composites.pop(key)[1]
+            item.release_tiles()
+            self.scene.removeItem(item)
+
+    def request(self, key, group, level):
+        members = [
+            (self.items[i].pyramid, self.state[i][1]) for i in group if self.state[i][0]
+        ]
+        self.pending.add(key)
+        self.pool.start(
+            _FlattenJob(self, self.generation, key, level, members, self.canvas_size)
+        )
+
+    def _on_composited(self, generation, key, level, pyramid):
+        if generation != self.generation:
+            return
+        self.pending.discard(key)
+        if pyramid is None:
+            return  # skipped: no longer wanted when its turn came
+        old = self.composites.get(key)
+        if old is not None:
+            if old[0] <= level:
+                return
+            old[1].release_tiles()
+            self.scene.removeItem(old[1])
+        item = TiledLayerItem(pyramid)
+        item.setTransform(
+            QTransform.fromScale(
+                self.canvas_size.width() / pyramid.width,
+                self.canvas_size.height() / pyramid.height,
+            )
+        )
+        item.setVisible(False)
+        self.scene.addItem(item)
+        self.composites[key] = (level, item)
+        self.update()
+
+    def apply(self, chosen):
+        """Shows chosen [(group, key)] composites in place of their member layers."""
+        members = set()
+        shown = set()
+        for group, key in chosen:
+            item = self.composites[key][1]
+            # Mid-point z keeps "below" under the edited layer, "above" over it
+            item.setZValue((group[0] + group[-1]) / 2)
+            shown.add(key)
+            members.update(group)
+        for i, item in self.items.items():
+            visible, opacity = self.state[i]
+            item.setOpacity(opacity)
+            item.setVisible(visible and i not in members)
+        for key, (_, item) in self.composites.items():
+            item.setVisible(key in shown)
+
+
+# --- HIGH-RESOLUTION EXPORT ---
+EXPORT_BAND = 256  # Rows rendered per band (and TIFF tile edge)
+EXPORT_FORMATS = (".png", ".tif", ".tiff")
+
+
+def render_export_band(layers, band, top, scale):
+    """
+    Paints output rows [top, top + band.height()) of the composite of
+    [(pyramid, opacity)] (bottom to top) at scale into band. Only the
+    source rows under the band are sampled, from the level nearest scale.
+    """
+    band.fill(Qt.GlobalColor.transparent)
+    p = QPainter(band)
+    p.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+    p.translate(0, -top)
+    canvas_top = top / scale
+    canvas_bottom = (top + band.height()) / scale
+    for pyramid, opacity in layers:
+        level = pyramid.levels[pyramid.level_for_scale(scale)]
+        f = level.height() / pyramid.height  # level pixels per canvas pixel
+        oy = pyramid.offset.y()
+        # One extra source row each side keeps the filter seamless across bands
+        y0 = max(0, math.floor((canvas_top - oy) * f) - 1)
+        y1 = min(level.height(), math.ceil((canvas_bottom - oy) * f) + 1)
+        if y1 <= y0:
+            continue
+        p.setOpacity(opacity)
+        p.drawImage(
+            QRectF(
+                pyramid.offset.x() * scale,
+                (oy + y0 / f) * scale,
+                pyramid.width * scale,
+                (y1 - y0) / f * scale,
+            ),
+            level,
+            QRectF(0, y0, level.width(), y1 - y0),
+        )
+    p.end()
+
+
+class _PngStreamWriter:
+    """Writes an RGBA PNG band by band; IDAT chunks are flushed as they fill."""
+
+    CHUNK = 1 << 20
+
+    def __init__(self, f, width, height):
+        self.f = f
+        self.zip = zlib.compressobj(6)
+        self.pending = []
+        self.pending_size = 0
+        f.write(b"\x89PNG\r\n\x1a\n")
+        # 8-bit RGBA, no interlacing
+        self.chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0))
+
+    def chunk(self, kind, data):
+        self.f.write(struct.pack(">I", len(data)))
+        self.f.write(kind)
+        self.f.write(data)
+        self.f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+    def write(self, data, stride, rows):
+        # Filter type 0 (none) before every row
+        raw = b"".join(
+            b"\0" + data[y * stride : (y + 1) * stride] for y in range(rows)
+        )
+        self.pending.append(self.zip.compress(raw))
+        self.pending_size += len(self.pending[-1])
+        if self.pending_size >= self.CHUNK:
+            self.flush()
+
+    def flush(self):
+        if self.pending_size:
+            self.chunk(b"IDAT", b"".join(self.pending))
+        self.pending, self.pending_size = [], 0
+
+    def close(self):
+        self.pending.append(self.zip.flush())
+        self.pending_size += len(self.pending[-1])
+        self.flush()
+        self.chunk(b"IEND", b"")
+
+
+class _TiffTileWriter:
+    """
+    Writes a deflate-compressed, tiled RGBA TIFF (EXPORT_BAND square tiles)
+    band by band; the directory goes at the end. Classic TIFF: < 4 GB.
+    """
+
+    def __init__(self, f, width, height):
+        self.f = f
+        self.width = width
+        self.height = height
+        self.offsets = []
+        self.counts = []
+        f.write(b"II*\0\0\0\0\0")  # IFD offset patched in close()
+
+    def write(self, data, stride, rows):
+        t = EXPORT_BAND
+        row_bytes = t * 4
+        for x in range(0, self.width, t):
+            start = x * 4
+            tile = b"".join(
+                data[y * stride + start : y * stride + start + row_bytes].ljust(
+                    row_bytes, b"\0"
+                )
+                for y in range(rows)
+            ).ljust(t * row_bytes, b"\0")
+            packed = zlib.compress(tile, 6)
+            self.f.write(b"\0" * (self.f.tell() & 1))
+            self.offsets.append(self.f.tell())
+            self.counts.append(len(packed))
+            self.f.write(packed)
+
+    def close(self):
+        f = self.f
+        short, long = 3, 4
+        tags = [
+            (256, long, [self.width]),
+            (257, long, [self.height]),
+            (258, short, [8, 8, 8, 8]),
+            (259, short, [8]),  # Adobe deflate
+            (262, short, [2]),  # RGB
+            (277, short, [4]),
+            (284, short, [1]),  # chunky
+            (322, short, [EXPORT_BAND]),
+            (323, short, [EXPORT_BAND]),
+            (324, long, self.offsets),
+            (325, long, self.counts),
+            (338, short, [2]),  # unassociated alpha
+        ]
+        entries = []
+        for tag, kind, values in tags:
+            code = "H" if kind == short else "I"
+            data = struct.pack(f"<{len(values)}{code}", *values)
+            if len(data) > 4:  # stored out of line, the entry points at it
+                f.write(b"\0" * (f.tell() & 1))
+                offset = f.tell()
+                f.write(data)
+                data = struct.pack("<I", offset)
+            entry = struct.pack("<HHI", tag, kind, len(values))
+            entries.append(entry + data.ljust(4, b"\0"))
+        f.write(b"\0" * (f.tell() & 1))
+        ifd = f.tell()
+        if ifd + 6 + 12 * len(entries) > 0xFFFFFFFF:
+            raise ValueError("export too large for TIFF (4 GB)")
+        f.write(struct.pack("<H", len(entries)) + b"".join(entries) + b"\0" * 4)
+        f.seek(4)
+        f.write(struct.pack("<I", ifd))
+
+
+def export_composite(layers, canvas_size, dest, scale=1.0, progress=None):
+    """
+    Writes the composite of [(pyramid, opacity)] (bottom to top) at scale
+    to dest (.png, or tiled .tif/.tiff). Rendering goes band by band
+    straight into the file, so memory stays at one EXPORT_BAND-row band
+    whatever the output size. progress(rows_done, rows) may return True to
+    cancel. Returns False if cancelled (dest is then left untouched).
+    """
+    ext = os.path.splitext(dest)[1].lower()
+    if ext not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported export format: {ext or dest}")
+    width = max(1, round(canvas_size.width() * scale))
+    height = max(1, round(canvas_size.height() * scale))
+    writer_class = _PngStreamWriter if ext == ".png" else _TiffTileWriter
+    band = QImage(width, EXPORT_BAND, QImage.Format.Format_ARGB32_Premultiplied)
+    tmp = dest + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            writer = writer_class(f, width, height)
+            for top in range(0, height, EXPORT_BAND):
+                if progress is not None and progress(top, height):
+                    raise InterruptedError
+                with TRACER.span("export.band", top=top):
+                    render_export_band(layers, band, top, scale)
+                    rgba = band.convertToFormat(QImage.Format.Format_RGBA8888)
+                    writer.write(
+                        rgba.constBits().asstring(rgba.sizeInBytes()),
+                        rgba.bytesPerLine(),
+                        min(EXPORT_BAND, height - top),
+                    )
+            writer.close()
+        os.replace(tmp, dest)
+    except BaseException as e:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        if isinstance(e, InterruptedError):
+            return False
+        raise
+    if progress is not None:
+        progress(height, height)
+    return True
+
+
+def load_export_layers(path, layers=None):
+    """
+    [(pyramid, 1.0)] of every layer of a schema folder or pack, plus the
+    canvas size, for exporting without the editor. Packed layers are
+    mapped, not decoded.
+    """
+    if layers is None:
+        layers = list_schema_layers(path)
+    pyramids = []
+    for name, _, _ in layers:
+        pyramid = load_layer_pyramid(os.path.join(path, name))
+        if pyramid is not None:
+            pyramids.append((pyramid, 1.0))
+    canvas = pyramids[0][0].canvas_size if pyramids else QSize()
+    return pyramids, canvas
+
+
+class _ExportJob(QRunnable):
+    def __init__(self, exporter, generation, layers, canvas_size, dest, scale):
+        super().__init__()
+        self.exporter = exporter
+        self.generation = generation
+        self.layers = layers
+        self.canvas_size = canvas_size
+        self.dest = dest
+        self.scale = scale
+
+    def progress(self, done, total):
+        try:
+            self.exporter._progress.emit(self.generation, done, total)
+        except RuntimeError:
+            return True  # exporter destroyed (application shutting down)
+        return self.exporter.generation != self.generation
+
+    def run(self):
+        error = ""
+        try:
+            export_composite(
+                self.layers, self.canvas_size, self.dest, self.scale, self.progress
+            )
+        except (OSError, ValueError) as e:
+            error = str(e)
+        try:
+            self.exporter._finished.emit(self.generation, self.dest, error)
+        except RuntimeError:
+            pass
+
+
+class CompositeExporter(QObject):
+    """Runs one export at a time on a worker thread; cancel() stops it."""
+
+    progress = pyqtSignal(int, int)  # rows done, rows
+    finished = pyqtSignal(str, str)  # dest, error ("" on success)
+    _progress = pyqtSignal(int, int, int)
+    _finished = pyqtSignal(int, str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.generation = 0
+        self._progress.connect(self._on_progress)
+        self._finished.connect(self._on_finished)
+
+    def export(self, layers, canvas_size, dest, scale=1.0):
+        self.cancel()
+        self.pool.start(
+            _ExportJob(self, self.generation, layers, canvas_size, dest, scale)
+        )
+
+    def cancel(self):
+        self.generation += 1
+
+    def _on_progress(self, generation, done, total):
+        if generation == self.generation:
+            self.progress.emit(done, total)
+
+    def _on_finished(self, generation, dest, error):
+        if generation == self.generation:
+            self.finished.emit(dest, error)
+
 
 # --- THEME ENGINE ---
 THEMES = {
@@ -87,6 +2760,8 @@ THEMES = {
 
 def get_stylesheet(theme_name):
     t = THEMES[theme_name]
+    accent = QColor(t["accent"])
+    tint = f"{accent.red()}, {accent.green()}, {accent.blue()}"
     return f"""
     /* --- GLOBAL --- */
     QMainWindow {{ background-color: {t['bg_main']}; }}
@@ -113,21 +2788,16 @@ def get_stylesheet(theme_name):
     QLineEdit:focus {{ border: 1px solid {t['accent']}; }}
     QLabel#Breadcrumb {{ color: {t['text_sub']}; font-weight: 600; font-size: 14px; }}
 
-    /* --- CARDS --- */
-    QFrame#SchemaCard {{ background-color: {t['bg_card']}; border-radius: 12px; border: 1px solid {t['border']}; }}
-    QFrame#SchemaCard:hover {{ border: 1px solid {t['accent']}; }}
-    
-    QFrame#FolderCard {{ background-color: {t['bg_card']}; border-radius: 12px; border: 1px solid {t['border']}; }}
-    QFrame#FolderCard:hover {{ border: 1px solid {t['folder']}; }}
-
-    QLabel#CardTitle {{ color: {t['text_main']}; font-weight: 600; font-size: 13px; }}
-    QLabel#CardMeta {{ color: {t['text_sub']}; font-size: 11px; }}
-    QLabel#CardPath {{ color: {t['text_sub']}; font-size: 10px; font-style: italic; }}
+    /* --- CARDS (painted by SchemaCardDelegate from THEMES) --- */
+    QListView#LibraryGrid {{ background: transparent; border: none; }}
 
     /* --- EDITOR --- */
     QFrame#Toolbar {{ background-color: {t['bg_side']}; border-bottom: 1px solid {t['border']}; }}
     QPushButton#BackBtn {{ background-color: transparent; color: {t['accent']}; font-weight: bold; border: 1px solid {t['accent']}; border-radius: 4px; padding: 5px 15px; }}
     QPushButton#BackBtn:hover {{ background-color: {t['accent']}; color: white; }}
+    QWidget#LayerRow {{ border-radius: 6px; }}
+    QWidget#LayerRow[hovered="true"] {{ background-color: rgba({tint}, 40); }}
+    QWidget#LayerRow[picked="true"] {{ background-color: rgba({tint}, 110); }}
     
     /* --- SCROLL & SLIDER --- */
     QScrollBar:vertical {{ background: {t['bg_main']}; width: 10px; }}
@@ -143,143 +2813,264 @@ def get_stylesheet(theme_name):
 # --- CUSTOM WIDGETS ---
 
 
-class SchemaCard(QFrame):
-    clicked = pyqtSignal(str, str, bool)  # Path, Name, Is_Folder
+class CardEntry:
+    """Compact per-card record held by LibraryModel (no widgets)."""
 
-    def __init__(
-        self, name, path, is_folder=False, width=160, parent=None, extra_info=None
-    ):
-        super().__init__(parent)
-        self.path = path
+    __slots__ = ("name", "path", "is_folder", "extra_info")
+
+    def __init__(self, name, path, is_folder=False, extra_info=None):
         self.name = name
+        self.path = path
         self.is_folder = is_folder
-        self.full_thumb = None
-        self.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.extra_info = extra_info
 
-        if self.is_folder:
-            self.setObjectName("FolderCard")
-        else:
-            self.setObjectName("SchemaCard")
 
-        self.layout = QVBoxLayout(self)
-        self.layout.setContentsMargins(0, 0, 0, 0)
-        self.layout.setSpacing(0)
+class LibraryModel(QAbstractListModel):
+    EntryRole = Qt.ItemDataRole.UserRole + 1
 
-        # 1. Thumbnail
-        self.thumb_container = QLabel()
-        self.thumb_container.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.thumb_container.setStyleSheet(
-            "background-color: transparent; border-top-left-radius: 12px; border-top-right-radius: 12px;"
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = []
+        self.rows_by_path = {}
+        self.thumbnails = {}  # path -> [QPixmap] mipmaps (None when no image)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return entry.name
+        if role == self.EntryRole:
+            return entry
+        return None
+
+    def set_entries(self, entries):
+        self.beginResetModel()
+        self.entries = entries
+        self.rows_by_path = {e.path: i for i, e in enumerate(entries)}
+        self.thumbnails = {}
+        self.endResetModel()
+
+    def needs_thumbnail(self, row):
+        entry = self.entries[row]
+        return not entry.is_folder and entry.path not in self.thumbnails
+
+    def set_thumbnail(self, path, levels):
+        row = self.rows_by_path.get(path)
+        if row is None:
+            return
+        self.thumbnails[path] = [QPixmap.fromImage(lvl) for lvl in levels] or None
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx)
+
+    def thumbnail_level(self, path, size):
+        """Smallest mipmap covering size (else the largest one), or None."""
+        levels = self.thumbnails.get(path)
+        if not levels:
+            return None
+        for pix in levels:
+            if pix.width() >= size.width() or pix.height() >= size.height():
+                return pix
+        return levels[-1]
+
+    def drop_thumbnails(self, paths):
+        """Forgets thumbnails of changed schemas so they get re-rendered."""
+        for path in paths:
+            if self.thumbnails.pop(path, False) is not False:
+                idx = self.index(self.rows_by_path[path])
+                self.dataChanged.emit(idx, idx)
+
+    def sync_entries(self, entries):
+        """
+        Updates rows in place to match entries (same ordering as the current
+        rows): removes vanished rows, inserts new ones, refreshes changed ones.
+        Thumbnails of untouched rows are kept.
+        """
+        wanted = {e.path: e for e in entries}
+        kept = [e.path for e in self.entries if e.path in wanted]
+        kept_set = set(kept)
+        if kept != [e.path for e in entries if e.path in kept_set]:
+            # Reordered: reset, but keep the thumbnails we already have
+            thumbnails = {p: t for p, t in self.thumbnails.items() if p in wanted}
+            self.set_entries(entries)
+            self.thumbnails = thumbnails
+            return
+        for row in range(len(self.entries) - 1, -1, -1):
+            if self.entries[row].path not in wanted:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                old = self.entries.pop(row)
+                self.thumbnails.pop(old.path, None)
+                self.endRemoveRows()
+        for row, entry in enumerate(entries):
+            current = self.entries[row] if row < len(self.entries) else None
+            if current is None or current.path != entry.path:
+                self.beginInsertRows(QModelIndex(), row, row)
+                self.entries.insert(row, entry)
+                self.endInsertRows()
+            elif (current.is_folder, current.extra_info) != (
+                entry.is_folder,
+                entry.extra_info,
+            ):
+                self.entries[row] = entry
+                idx = self.index(row)
+                self.dataChanged.emit(idx, idx)
+        self.rows_by_path = {e.path: i for i, e in enumerate(self.entries)}
+
+
+class SchemaCardDelegate(QStyledItemDelegate):
+    """Paints a schema / collection card. Only visible cards are ever painted."""
+
+    INFO_HEIGHT = 70
+
+    def __init__(self, theme_name, card_size, parent=None):
+        super().__init__(parent)
+        self.theme = THEMES[theme_name]
+        self.card_size = card_size
+        self.folder_icons = {}
+
+    def card_height(self):
+        return int(self.card_size * 1.3)
+
+    def sizeHint(self, option, index):
+        return QSize(self.card_size, self.card_height())
+
+    def folder_icon(self, size):
+        pix = self.folder_icons.get(size)
+        if pix is None:
+            style = QApplication.style()
+            pix = style.standardIcon(style.StandardPixmap.SP_DirIcon).pixmap(size, size)
+            self.folder_icons[size] = pix
+        return pix
+
+    def paint(self, painter, option, index):
+        entry = index.data(LibraryModel.EntryRole)
+        t = self.theme
+        cell = option.rect
+        rect = QRect(
+            cell.x() + (cell.width() - self.card_size) // 2,
+            cell.y() + (cell.height() - self.card_height()) // 2,
+            self.card_size,
+            self.card_height(),
         )
+        hovered = bool(option.state & QStyle.StateFlag.State_MouseOver)
 
-        if self.is_folder:
-            icon = self.style().standardIcon(self.style().StandardPixmap.SP_DirIcon)
-            self.thumb_container.setPixmap(icon.pixmap(64, 64))
-        else:
-            self.thumb_container.setText("Loading...")
-            self.generate_composite_thumbnail()
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        border = t["border"]
+        if hovered:
+            border = t["folder"] if entry.is_folder else t["accent"]
+        painter.setPen(QPen(QColor(border), 1))
+        painter.setBrush(QColor(t["bg_card"]))
+        painter.drawRoundedRect(QRectF(rect).adjusted(0.5, 0.5, -0.5, -0.5), 12, 12)
 
-        self.layout.addWidget(self.thumb_container, 1)
+        # 1. Thumbnail
+        thumb_rect = QRect(
+            rect.x() + 10,
+            rect.y() + 10,
+            rect.width() - 20,
+            rect.height() - self.INFO_HEIGHT - 10,
+        )
+        if entry.is_folder:
+            icon_size = int(rect.width() * 0.4)
+            pix = self.folder_icon(icon_size)
+            self.draw_centered(painter, thumb_rect, pix)
+        elif thumb_rect.height() > 0:
+            model = index.model()
+            if entry.path in model.thumbnails:
+                pix = model.thumbnail_level(entry.path, thumb_rect.size())
+                if pix is not None:
+                    self.draw_fitted(painter, thumb_rect, pix)
+            else:
+                painter.setPen(QColor(t["text_sub"]))
+                painter.drawText(thumb_rect, Qt.AlignmentFlag.AlignCenter, "Loading...")
 
         # 2. Info
-        info_frame = QFrame()
-        info_frame.setStyleSheet(
-            "background-color: transparent; border-top: 1px solid transparent;"
-        )
-        info_layout = QVBoxLayout(info_frame)
-        info_layout.setContentsMargins(10, 8, 10, 8)
-        info_layout.setSpacing(2)
-
-        self.name_lbl = QLabel(name)
-        self.name_lbl.setObjectName("CardTitle")
-        self.name_lbl.setWordWrap(True)
-        self.name_lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        info_layout.addWidget(self.name_lbl)
-
-        type_text = "COLLECTION" if is_folder else "SCHEMA"
-        self.meta_lbl = QLabel(type_text)
-        self.meta_lbl.setObjectName("CardMeta")
-        self.meta_lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        info_layout.addWidget(self.meta_lbl)
+        info = QRect(
+            rect.x() + 10,
+            rect.bottom() - self.INFO_HEIGHT + 8,
+            rect.width() - 20,
+            self.INFO_HEIGHT - 16,
+        )
+        wrap = Qt.AlignmentFlag.AlignHCenter | Qt.TextFlag.TextWordWrap
+
+        font = QFont(option.font)
+        font.setPixelSize(13)
+        font.setWeight(QFont.Weight.DemiBold)
+        painter.setFont(font)
+        painter.setPen(QColor(t["text_main"]))
+        fm = QFontMetrics(font)
+        title_h = min(
+            fm.boundingRect(info, int(wrap), entry.name).height(),
+            fm.lineSpacing() * 2,
+        )
+        painter.drawText(
+            QRect(info.x(), info.y(), info.width(), title_h), wrap, entry.name
+        )
+        y = info.y() + title_h + 2
+
+        font = QFont(option.font)
+        font.setPixelSize(11)
+        painter.setFont(font)
+        painter.setPen(QColor(t["text_sub"]))
+        type_text = "COLLECTION" if entry.is_folder else "SCHEMA"
+        meta_h = QFontMetrics(font).lineSpacing()
+        painter.drawText(
+            QRect(info.x(), y, info.width(), meta_h),
+            Qt.AlignmentFlag.AlignHCenter,
+            type_text,
+        )
+        y += meta_h
 
         # Show path if searching (extra_info)
-        if extra_info:
-            path_lbl = QLabel(extra_info)
-            path_lbl.setObjectName("CardPath")
-            path_lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            path_lbl.setWordWrap(True)
-            info_layout.addWidget(path_lbl)
-
-        self.layout.addWidget(info_frame)
-        self.set_card_size(width)
-
-    def generate_composite_thumbnail(self):
-        try:
-            files = [f for f in os.listdir(self.path) if f.lower().endswith(VALID_EXTS)]
-
-            if not files:
-                return
-
-            # --- UPDATED SORTING LINE ---
-            files.sort(key=natural_sort_key)
-            # ----------------------------
-
-            base = QPixmap(os.path.join(self.path, files[0]))
-            if base.isNull():
-                return
-
-            comp = QPixmap(base.size())
-            comp.fill(Qt.GlobalColor.transparent)
-            p = QPainter(comp)
-            p.setRenderHint(QPainter.RenderHint.Antialiasing)
-            p.drawPixmap(0, 0, base)
-
-            for f in files[1:]:
-                layer = QPixmap(os.path.join(self.path, f))
-                if not layer.isNull():
-                    p.drawPixmap(0, 0, layer)
-            p.end()
-            self.full_thumb = comp
-            self.update_thumbnail_size()
-        except:
-            pass
-
-    def set_card_size(self, width):
-        height = int(width * 1.3)
-        self.setFixedSize(width, height)
-        self.update_thumbnail_size()
-
-    def update_thumbnail_size(self):
-        if self.is_folder:
-            icon_size = int(self.width() * 0.4)
-            self.thumb_container.setPixmap(
-                self.style()
-                .standardIcon(self.style().StandardPixmap.SP_DirIcon)
-                .pixmap(icon_size, icon_size)
+        if entry.extra_info:
+            font.setPixelSize(10)
+            font.setItalic(True)
+            painter.setFont(font)
+            painter.drawText(
+                QRect(info.x(), y, info.width(), rect.bottom() - y),
+                wrap,
+                entry.extra_info,
             )
-        elif self.full_thumb:
-            target_h = self.height() - 70
-            if target_h > 0:
-                scaled = self.full_thumb.scaled(
-                    self.width() - 20,
-                    target_h,
-                    Qt.AspectRatioMode.KeepAspectRatio,
-                    Qt.TransformationMode.SmoothTransformation,
-                )
-                self.thumb_container.setPixmap(scaled)
-
-    def mousePressEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-            self.clicked.emit(self.path, self.name, self.is_folder)
+        painter.restore()
+
+    @staticmethod
+    def draw_fitted(painter, rect, pix):
+        """Draws pix fitted (aspect kept) and centred in rect."""
+        size = pix.size().scaled(rect.size(), Qt.AspectRatioMode.KeepAspectRatio)
+        target = QRect(
+            rect.x() + (rect.width() - size.width()) // 2,
+            rect.y() + (rect.height() - size.height()) // 2,
+            size.width(),
+            size.height(),
+        )
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.drawPixmap(target, pix)
+
+    @staticmethod
+    def draw_centered(painter, rect, pix):
+        w = pix.width() / pix.devicePixelRatio()
+        h = pix.height() / pix.devicePixelRatio()
+        painter.drawPixmap(
+            int(rect.x() + (rect.width() - w) / 2),
+            int(rect.y() + (rect.height() - h) / 2),
+            pix,
+        )
 
 
 class LayerRow(QWidget):
     opacityChanged = pyqtSignal(float)
     visibilityChanged = pyqtSignal(bool)
+    editStarted = pyqtSignal()  # opacity slider grabbed
+    editFinished = pyqtSignal()
+    previewRequested = pyqtSignal()  # hovered before a preview was set
 
-    def __init__(self, name, pixmap, parent=None):
+    def __init__(self, name, parent=None):
         super().__init__(parent)
-        self.full_pixmap = pixmap
+        self.setObjectName("LayerRow")
+        self.setAttribute(Qt.WidgetAttribute.WA_StyledBackground)
 
         # --- THE FIX: Correct way to set popup flags ---
         self.preview = QLabel(self)
@@ -290,14 +3081,7 @@ class LayerRow(QWidget):
         self.preview.setScaledContents(True)
         self.preview.hide()
 
-        self.thumbnail = None
-        if self.full_pixmap and not self.full_pixmap.isNull():
-            self.thumbnail = self.full_pixmap.scaled(
-                400,
-                400,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation,
-            )
+        self.thumbnail = None  # built on first hover, see set_preview()
 
         layout = QHBoxLayout(self)
         layout.setContentsMargins(5, 5, 5, 5)
@@ -315,6 +3099,8 @@ class LayerRow(QWidget):
         self.slider.setValue(100)
         self.slider.setFixedWidth(80)
         self.slider.valueChanged.connect(self.update_opacity)
+        self.slider.sliderPressed.connect(self.editStarted.emit)
+        self.slider.sliderReleased.connect(self.editFinished.emit)
         layout.addWidget(self.slider)
 
         self.pct_label = QLabel("100%")
@@ -325,9 +3111,25 @@ class LayerRow(QWidget):
         self.pct_label.setText(f"{value}%")
         self.opacityChanged.emit(value / 100.0)
 
+    def set_highlight(self, name, on):
+        """Toggles the 'picked' or 'hovered' style (clicked / hovered on canvas)."""
+        if self.property(name) != on:
+            self.setProperty(name, on)
+            self.style().unpolish(self)
+            self.style().polish(self)
+
+    def set_preview(self, image):
+        self.thumbnail = QPixmap.fromImage(image)
+        if self.underMouse():
+            self.show_preview()
+
     def enterEvent(self, event):
         if not self.thumbnail:
+            self.previewRequested.emit()
             return
+        self.show_preview()
+
+    def show_preview(self):
         self.preview.setPixmap(self.thumbnail)
         self.preview.resize(self.thumbnail.size())
 
@@ -340,7 +3142,77 @@ class LayerRow(QWidget):
         self.preview.hide()
 
 
+class TiledLayerItem(QGraphicsItem):
+    """
+    Level-of-detail layer. Each paint picks the pyramid level matching the
+    view scale and only draws the fixed-size tiles intersecting the exposed
+    rect. Tiles are uploaded lazily into the shared QPixmapCache.
+    """
+
+    def __init__(self, pyramid, parent=None):
+        super().__init__(parent)
+        self.pyramid = pyramid
+        self.tile_keys = set()
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+        self.setPos(QPointF(pyramid.offset))
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.pyramid.width, self.pyramid.height)
+
+    def tile(self, level, tx, ty):
+        key = f"tile:{self.pyramid.key}:{level}:{tx}:{ty}"
+        pix = QPixmapCache.find(key)
+        if pix is None:
+            image = self.pyramid.levels[level]
+            rect = QRect(tx * TILE_SIZE, ty * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+            pix = QPixmap.fromImage(image.copy(rect.intersected(image.rect())))
+            QPixmapCache.insert(key, pix)
+            self.tile_keys.add(key)
+        return pix
+
+    def release_tiles(self):
+        for key in self.tile_keys:
+            QPixmapCache.remove(key)
+        self.tile_keys.clear()
+
+    def paint(self, painter, option, widget=None):
+        scale = option.levelOfDetailFromTransform(painter.worldTransform())
+        level = self.pyramid.level_for_scale(scale)
+        image = self.pyramid.levels[level]
+        fx = self.pyramid.width / image.width()
+        fy = self.pyramid.height / image.height()
+
+        exposed = option.exposedRect.intersected(self.boundingRect())
+        if exposed.isEmpty():
+            return
+        tx0 = max(0, int(exposed.left() / fx) // TILE_SIZE)
+        ty0 = max(0, int(exposed.top() / fy) // TILE_SIZE)
+        tx1 = min(
+            (image.width() - 1) // TILE_SIZE, int(exposed.right() / fx) // TILE_SIZE
+        )
+        ty1 = min(
+            (image.height() - 1) // TILE_SIZE, int(exposed.bottom() / fy) // TILE_SIZE
+        )
+
+        # Non-antialiased target rects snap to the pixel grid: no seams
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                pix = self.tile(level, tx, ty)
+                target = QRectF(
+                    tx * TILE_SIZE * fx,
+                    ty * TILE_SIZE * fy,
+                    pix.width() * fx,
+                    pix.height() * fy,
+                )
+                painter.drawPixmap(target, pix, QRectF(pix.rect()))
+
+
 class AnatomyCanvas(QGraphicsView):
+    viewScaleChanged = pyqtSignal()
+    layerHovered = pyqtSignal(int)  # layer index under the cursor, -1 for none
+    layerClicked = pyqtSignal(int)
+
     def __init__(self, scene):
         super().__init__(scene)
         self.setRenderHints(
@@ -355,34 +3227,287 @@ class AnatomyCanvas(QGraphicsView):
         # Background handled by CSS mainly, but for canvas specific:
         self.setBackgroundBrush(QBrush(QColor("#000000")))
 
+        # Wheel deltas are summed and applied once per frame; trackpads
+        # otherwise trigger a full repaint for every one of their events
+        self.pending_zoom = 0.0  # in wheel notches (120 units each)
+        self.zoom_timer = QTimer(self)
+        self.zoom_timer.setSingleShot(True)
+        self.zoom_timer.setInterval(16)
+        self.zoom_timer.timeout.connect(self.apply_pending_zoom)
+        # Fast (nearest) sampling while zooming/panning, smooth once idle
+        self.interacting = False
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(200)
+        self.idle_timer.timeout.connect(self.end_interaction)
+        self.frame_times = None  # deque of paint durations (ms) while the HUD is on
+        self.picker = LayerPickIndex()  # filled by the editor as layers load
+        self.hovered_layer = -1
+        self.press_pos = None
+        self.viewport().setMouseTracking(True)
+
+    def paintEvent(self, event):
+        if not TRACER.enabled and self.frame_times is None:
+            return super().paintEvent(event)
+        start = time.perf_counter_ns()
+        super().paintEvent(event)
+        end = time.perf_counter_ns()
+        if TRACER.enabled:
+            TRACER.add("canvas.paint", start, end)
+        if self.frame_times is not None:
+            self.frame_times.append((end - start) / 1e6)
+
+    def layer_at(self, pos):
+        """Topmost visible layer under a viewport position, or -1."""
+        point = self.mapToScene(pos)
+        return self.picker.pick(point.x(), point.y())
+
+    def set_hovered_layer(self, index):
+        if index != self.hovered_layer:
+            self.hovered_layer = index
+            self.layerHovered.emit(index)
+
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        if event.buttons() == Qt.MouseButton.NoButton:
+            self.set_hovered_layer(self.layer_at(event.position().toPoint()))
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.press_pos = event.position().toPoint()
+        super().mousePressEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        if event.button() != Qt.MouseButton.LeftButton or self.press_pos is None:
+            return
+        pos = event.position().toPoint()
+        moved = (pos - self.press_pos).manhattanLength()
+        self.press_pos = None
+        if moved < QApplication.startDragDistance():  # a click, not a pan
+            self.layerClicked.emit(self.layer_at(pos))
+
+    def leaveEvent(self, event):
+        self.set_hovered_layer(-1)
+        super().leaveEvent(event)
+
     def wheelEvent(self, event: QWheelEvent):
-        zoom_in = 1.15
-        zoom_out = 1 / 1.15
-        if event.angleDelta().y() > 0:
-            self.scale(zoom_in, zoom_in)
+        self.pending_zoom += event.angleDelta().y() / 120
+        self.begin_interaction()
+        if not self.zoom_timer.isActive():
+            self.zoom_timer.start()
+        event.accept()
+
+    def apply_pending_zoom(self):
+        steps, self.pending_zoom = self.pending_zoom, 0.0
+        if steps:
+            factor = 1.15**steps
+            self.scale(factor, factor)
+
+    def scrollContentsBy(self, dx, dy):
+        self.begin_interaction()
+        super().scrollContentsBy(dx, dy)
+
+    def begin_interaction(self):
+        if not self.interacting:
+            self.interacting = True
+            self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+        self.idle_timer.start()
+
+    def end_interaction(self):
+        self.interacting = False
+        self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+        self.viewport().update()
+
+    def scale(self, sx, sy):
+        super().scale(sx, sy)
+        self.viewScaleChanged.emit()
+
+    def fitInView(self, *args):
+        super().fitInView(*args)
+        self.viewScaleChanged.emit()
+
+
+class PerfHud(QLabel):
+    """
+    On-screen performance overlay: canvas frame times, cache hit rates and
+    decoded image memory. Toggled with Ctrl+Shift+H (or ANATO_HUD=1); costs
+    nothing while hidden.
+    """
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.main_window = window
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 180); color: #a5f3fc; "
+            "font-family: monospace; font-size: 11px; padding: 6px; border-radius: 6px;"
+        )
+        self.timer = QTimer(self)
+        self.timer.setInterval(500)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        self.set_active(not self.isVisible())
+
+    def set_active(self, active):
+        canvas = self.main_window.editor.view
+        canvas.frame_times = deque(maxlen=120) if active else None
+        self.setVisible(active)
+        if active:
+            self.timer.start()
+            self.refresh()
         else:
-            self.scale(zoom_out, zoom_out)
+            self.timer.stop()
+
+    @staticmethod
+    def hit_rate(hits, misses):
+        total = hits + misses
+        return f"{100 * hits / total:.0f}%" if total else "-"
+
+    def refresh(self):
+        mb = 1024 * 1024
+        frames = self.main_window.editor.view.frame_times
+        if frames:
+            avg = sum(frames) / len(frames)
+            frame = f"{avg:.1f} ms avg, {max(frames):.1f} max"
+        else:
+            frame = "-"
+        layers = get_layer_cache().stats()
+        thumbs = get_thumbnail_cache()
+        loader = self.main_window.library.thumb_loader
+        cards = self.main_window.library.grid_model.thumbnails.values()
+        card_bytes = sum(
+            pix.width() * pix.height() * 4
+            for levels in cards
+            if levels
+            for pix in levels
+        )
+        tiles = sum(
+            len(item.tile_keys) for item in self.main_window.editor.layer_items.values()
+        )
+        lines = [
+            f"canvas frame  {frame}",
+            f"layer cache   {layers['bytes'] / mb:.0f}/"
+            f"{layers['max_bytes'] / mb:.0f} MB, "
+            f"hits {self.hit_rate(layers['hits'], layers['misses'])}",
+            f"thumb cache   hits {self.hit_rate(thumbs.hits, thumbs.misses)}",
+            f"card pixmaps  {card_bytes / mb:.1f} MB",
+            f"previews      {loader.preview_bytes / mb:.1f} MB",
+            f"canvas tiles  <= {tiles * TILE_SIZE * TILE_SIZE * 4 / mb:.0f} MB "
+            f"(limit {TILE_CACHE_MB})",
+        ]
+        if TRACER.enabled:
+            lines.append(f"tracing       {len(TRACER.events)} spans")
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        self.move(12, self.main_window.height() - self.height() - 12)
+        self.raise_()
 
 
 # --- SCREENS ---
 
 
+class _LibraryRefreshJob(QRunnable):
+    """
+    Re-validates a cached catalog against the disk and indexes it. With
+    stream, every directory is also reported as soon as it is classified.
+    """
+
+    def __init__(self, screen, generation, catalog, stream=False):
+        super().__init__()
+        self.screen = screen
+        self.generation = generation
+        self.catalog = catalog
+        self.stream = stream
+
+    def on_scanned(self, path, node):
+        try:
+            self.screen._directoryScanned.emit(self.generation, path, node)
+        except RuntimeError:
+            pass
+
+    def run(self):
+        changed = self.catalog.refresh(
+            on_scanned=self.on_scanned if self.stream else None
+        )
+        if changed:
+            self.catalog.save()
+        index = SearchIndex.from_catalog(self.catalog)
+        try:
+            self.screen._libraryRefreshed.emit(
+                self.generation, self.catalog, index, changed
+            )
+        except RuntimeError:
+            pass  # screen destroyed (application shutting down)
+
+
+class _LibraryChangeJob(QRunnable):
+    """Re-lists directories reported by the watcher and re-indexes them."""
+
+    def __init__(self, screen, generation, catalog, index, paths):
+        super().__init__()
+        self.screen = screen
+        self.generation = generation
+        self.catalog = catalog
+        self.index = index
+        self.paths = paths
+
+    def run(self):
+        changed = self.catalog.rescan(self.paths)
+        if changed:
+            self.catalog.save()
+            self.index.update_dirs(self.catalog, changed)
+        try:
+            self.screen._libraryChanged.emit(self.generation, self.catalog, changed)
+        except RuntimeError:
+            pass  # screen destroyed (application shutting down)
+
+
 class LibraryScreen(QWidget):
     schemaSelected = pyqtSignal(str, str)
     themeChanged = pyqtSignal(str)  # Emit 'Dark' or 'Light'
+    libraryShown = pyqtSignal()  # first cards of the opened library are on screen
+    libraryReady = pyqtSignal()  # ...and its catalog is re-validated and indexed
+    _libraryRefreshed = pyqtSignal(int, object, object, object)
+    _directoryScanned = pyqtSignal(int, str, object)
+    _libraryChanged = pyqtSignal(int, object, object)
 
     def __init__(self):
         super().__init__()
         self.root_path = ""
         self.current_path = ""
+        self.catalog = None
+        self.search_index = None
+        self.search_engine = SearchEngine(self)
+        self.search_engine.resultsReady.connect(self.show_search_results)
+        self.shown_query = None
+        self.watcher = LibraryWatcher(self)
+        self.watcher.directoriesChanged.connect(self.on_library_changed)
         self.settings = QSettings(ORGANIZATION_NAME, DOMAIN_NAME)
         self.current_theme = self.settings.value("theme", "Dark")
         self.card_size = 180
+        self.thumb_loader = ThumbnailLoader(self)
+        self.thumb_loader.thumbnailReady.connect(self.on_thumbnail_ready)
+        self.refresh_pool = QThreadPool(self)
+        self.refresh_pool.setMaxThreadCount(1)
+        self.refresh_generation = 0
+        self.pending_changes = set()  # watcher paths waiting for the worker
+        self.change_running = False
+        self.scanning = False  # first scan of the library still streaming in
+        self.stream_timer = QTimer(self)  # batches streamed cards per frame
+        self.stream_timer.setSingleShot(True)
+        self.stream_timer.setInterval(30)
+        self.stream_timer.timeout.connect(self.show_streamed_entries)
+        self._libraryRefreshed.connect(self.apply_refreshed_library)
+        self._directoryScanned.connect(self.on_directory_scanned)
+        self._libraryChanged.connect(self.apply_library_changes)
         self.setup_ui()
 
-        saved_path = self.settings.value("root_path")
-        if saved_path and os.path.exists(saved_path):
-            self.set_root_library(saved_path)
+        # Restored once the window is on screen (restore_library)
+        self.pending_root = self.settings.value("root_path") or None
+        self.restore_scheduled = False
 
     def setup_ui(self):
         main_layout = QHBoxLayout(self)
@@ -471,18 +3596,43 @@ class LibraryScreen(QWidget):
         header_layout.addWidget(btn_zoom_in)
         content_layout.addLayout(header_layout)
 
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setFrameShape(QFrame.Shape.NoFrame)
-        scroll.setStyleSheet("background: transparent;")
-        self.grid_container = QWidget()
-        self.grid_layout = QGridLayout(self.grid_container)
-        self.grid_layout.setAlignment(
-            Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft
-        )
-        self.grid_layout.setSpacing(25)
-        scroll.setWidget(self.grid_container)
-        content_layout.addWidget(scroll)
+        # Virtualized grid: one model row per card, painted by the delegate
+        self.grid_model = LibraryModel(self)
+        self.grid_delegate = SchemaCardDelegate(
+            self.current_theme, self.card_size, self
+        )
+        self.grid_view = QListView()
+        self.grid_view.setObjectName("LibraryGrid")
+        self.grid_view.setViewMode(QListView.ViewMode.IconMode)
+        self.grid_view.setMovement(QListView.Movement.Static)
+        self.grid_view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.grid_view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.grid_view.setUniformItemSizes(True)
+        self.grid_view.setWrapping(True)
+        self.grid_view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.grid_view.setVerticalScrollMode(
+            QAbstractItemView.ScrollMode.ScrollPerPixel
+        )
+        self.grid_view.verticalScrollBar().setSingleStep(20)
+        self.grid_view.setFrameShape(QFrame.Shape.NoFrame)
+        self.grid_view.setMouseTracking(True)
+        self.grid_view.viewport().setAttribute(Qt.WidgetAttribute.WA_Hover)
+        self.grid_view.viewport().setCursor(Qt.CursorShape.PointingHandCursor)
+        self.grid_view.setModel(self.grid_model)
+        self.grid_view.setItemDelegate(self.grid_delegate)
+        self.grid_view.clicked.connect(self.on_index_clicked)
+        self.update_grid_size()
+        content_layout.addWidget(self.grid_view)
+
+        # Re-prioritise thumbnails that scroll into view (coalesced)
+        self.schedule_timer = QTimer(self)
+        self.schedule_timer.setSingleShot(True)
+        self.schedule_timer.setInterval(50)
+        self.schedule_timer.timeout.connect(self.schedule_thumbnails)
+        # Not start itself: valueChanged's int would become the interval
+        self.grid_view.verticalScrollBar().valueChanged.connect(
+            lambda _: self.schedule_timer.start()
+        )
         main_layout.addWidget(content_widget)
 
     def create_nav_btn(self, text):
@@ -497,12 +3647,95 @@ class LibraryScreen(QWidget):
         self.current_theme = new_theme
         self.settings.setValue("theme", new_theme)
         self.btn_theme.setText(f"Theme: {new_theme}")
+        self.grid_delegate.theme = THEMES[new_theme]
+        self.grid_view.viewport().update()
         self.themeChanged.emit(new_theme)
 
     def set_root_library(self, path):
-        self.root_path = path
+        path = os.path.normpath(path)
         self.settings.setValue("root_path", path)
+        self.open_root(path)
+
+    def restore_library(self):
+        """Cold-start path for the saved library (see open_root)."""
+        path, self.pending_root = self.pending_root, None
+        if self.root_path:
+            return  # another library was opened first; it reports readiness
+        if not path or not os.path.exists(path):
+            # Never chosen, or moved / unmounted: keep the select-folder prompt
+            self.libraryReady.emit()
+            return
+        self.open_root(os.path.normpath(path))
+
+    def open_root(self, path):
+        """
+        Shows the library at path without touching its folders on the GUI
+        thread. A cached catalog is shown at once (thumbnails come from the
+        on-disk cache) while a worker re-scans it; a library never scanned
+        before streams its cards in as the scan threads classify folders.
+        Watching and searching start once the scan and index are done.
+        """
+        catalog = LibraryCatalog(path)
+        catalog.load()
+        self.refresh_generation += 1
+        self.root_path = path
+        self.catalog = catalog
+        self.search_index = None
+        self.search_engine.set_index(None)
+        self.watcher.reset(())
+        self.pending_changes.clear()
+        self.change_running = False
+        self.scanning = not catalog.nodes
         self.navigate_to(path)
+        if not self.scanning:
+            self.libraryShown.emit()
+
+        # The worker refreshes its own copy; the shown one stays read-only
+        fresh = LibraryCatalog(path)
+        fresh.nodes = dict(catalog.nodes)
+        self.refresh_pool.start(
+            _LibraryRefreshJob(self, self.refresh_generation, fresh, self.scanning)
+        )
+
+    def on_directory_scanned(self, generation, path, node):
+        """Adds a freshly classified folder to the shown (partial) catalog."""
+        if generation != self.refresh_generation or not self.scanning:
+            return
+        self.catalog.nodes[path] = node
+        folder = os.path.normpath(self.current_path)
+        if path == folder or os.path.dirname(path) == folder:
+            if not self.stream_timer.isActive():
+                self.stream_timer.start()
+
+    def show_streamed_entries(self):
+        if not self.scanning or self.search_bar.text():
+            return  # search waits for the index
+        # Inserted in natural order, next to the cards already shown
+        folder = os.path.normpath(self.current_path)
+        self.grid_model.sync_entries(self.folder_entries(folder))
+        self.schedule_thumbnails()
+        if folder == self.catalog.root and self.grid_model.entries:
+            self.libraryShown.emit()
+
+    def apply_refreshed_library(self, generation, catalog, index, changed):
+        if generation != self.refresh_generation:
+            return  # another library was opened meanwhile
+        streamed, self.scanning = self.scanning, False
+        self.stream_timer.stop()
+        self.catalog = catalog
+        self.search_index = index
+        self.search_engine.set_index(index)
+        self.watcher.reset(catalog.nodes)
+        if streamed:
+            # Cards are already shown; just drop any that vanished meanwhile
+            self.apply_catalog_changes(())
+            self.libraryShown.emit()
+        elif changed:
+            # Same bookkeeping as a live change (paths already re-scanned)
+            self.apply_catalog_changes(changed)
+        elif self.search_bar.text():
+            self.search_engine.submit(self.search_bar.text())
+        self.libraryReady.emit()
 
     def select_root_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Root")
@@ -522,11 +3755,11 @@ class LibraryScreen(QWidget):
             self.navigate_to(self.root_path)
         elif text == "Prof. Alami":
             p = os.path.join(self.root_path, "Partie Prof Alami")
-            if os.path.exists(p):
+            if self.catalog and self.catalog.contains(p):
                 self.navigate_to(p)
         elif text == "Prof. Hammoud":
             p = os.path.join(self.root_path, "Partie Prof Hammoud")
-            if os.path.exists(p):
+            if self.catalog and self.catalog.contains(p):
                 self.navigate_to(p)
 
     def navigate_to(self, path):
@@ -543,67 +3776,56 @@ class LibraryScreen(QWidget):
         self.populate_grid(path)
 
     def on_search_text_changed(self, text):
+        self.thumb_loader.cancel_all()
         if not text:
             # Revert to normal view of current path
+            self.search_engine.cancel()
             self.navigate_to(self.current_path)
             return
 
-        # SEARCH MODE
+        # SEARCH MODE (debounced, runs off the GUI thread)
         self.lbl_path.setText(f"Searching for '{text}' in entire library...")
         self.btn_back.setEnabled(False)
-        self.perform_universal_search(text)
+        self.search_engine.submit(text)
 
     def perform_universal_search(self, query):
-        """Recursive deep dive search."""
-        query = query.lower()
-        results = []
-
-        # Clear grid
-        while self.grid_layout.count():
-            item = self.grid_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
-        # Walk entire root
-        for root, dirs, files in os.walk(self.root_path):
-            folder_name = os.path.basename(root)
-
-            # 1. Check if the FOLDER itself matches and is a Schema or Collection
-            # Logic: If folder name matches query
-            if query in folder_name.lower():
-                # Is it a schema?
-                has_images = any(f.lower().endswith(VALID_EXTS) for f in files)
-                if has_images:
-                    results.append(
-                        (folder_name, root, False)
-                    )  # Name, Path, IsFolder=False (It's a schema)
-                elif any(os.path.isdir(os.path.join(root, d)) for d in dirs):
-                    results.append(
-                        (folder_name, root, True)
-                    )  # Name, Path, IsFolder=True (It's a collection)
+        """Immediate (non-debounced) search of the index."""
+        self.search_engine.cancel()
+        if self.search_index is None:
+            return
+        results, _ = self.search_index.search(query)
+        self.show_search_results(query, results)
+
+    @traced("grid.search_results")
+    def show_search_results(self, query, results):
+        # Same query re-run after a library change -> update rows in place
+        refresh = query == self.shown_query
 
         # Create cards for results
-        cards = []
-        for name, path, is_folder in results:
+        entries = []
+        for name, path, is_folder, layer_name in results:
             # Calculate relative path for context
             rel_path = os.path.relpath(path, self.root_path)
-            card = SchemaCard(
-                name,
-                path,
-                is_folder=is_folder,
-                width=self.card_size,
-                extra_info=rel_path,
-            )
-            card.clicked.connect(self.on_card_clicked)
-            cards.append(card)
+            if layer_name:
+                rel_path = f"{rel_path} · {layer_name}"
+            entries.append(CardEntry(name, path, is_folder, extra_info=rel_path))
 
-        self.current_cards = cards
-        self.reflow_grid(cards)
+        if refresh:
+            self.grid_model.sync_entries(entries)
+            self.schedule_thumbnails()
+        else:
+            self.set_entries(entries)
+        self.shown_query = query
 
     def go_up_level(self):
         if self.current_path != self.root_path:
             self.navigate_to(os.path.dirname(self.current_path))
 
+    def on_index_clicked(self, index):
+        entry = self.grid_model.data(index, LibraryModel.EntryRole)
+        if entry is not None:
+            self.on_card_clicked(entry.path, entry.name, entry.is_folder)
+
     def on_card_clicked(self, path, name, is_folder):
         if is_folder:
             self.search_bar.clear()  # Clear search to enter folder normally
@@ -611,82 +3833,198 @@ class LibraryScreen(QWidget):
         else:
             self.schemaSelected.emit(path, name)
 
+    @traced("grid.populate")
     def populate_grid(self, folder_path):
-        while self.grid_layout.count():
-            item = self.grid_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
-        try:
-            entries = list(os.scandir(folder_path))
-        except:
+        if self.catalog is None:
+            self.set_entries([])
             return
+        if not self.catalog.contains(folder_path) and not self.scanning:
+            # Outside the scanned tree (or vanished): catalog it on demand
+            changed = self.catalog.refresh(folder_path)
+            if changed:
+                self.catalog.save()
+                if self.search_index is not None:
+                    self.search_index.update_dirs(self.catalog, changed)
+                self.watcher.watch(p for p in changed if p in self.catalog.nodes)
+
+        self.set_entries(self.folder_entries(folder_path))
+
+    def folder_entries(self, folder_path):
+        # Children come naturally sorted from the catalog
+        return [
+            CardEntry(name, path, is_folder=(kind == "collection"))
+            for name, path, kind in self.catalog.children(folder_path)
+        ]
+
+    def on_library_changed(self, paths):
+        """Queues coalesced watcher events for the refresh worker."""
+        if self.catalog is None or self.search_index is None:
+            return  # no library, or the restored one is still being re-validated
+        root = self.catalog.root
+        self.pending_changes.update(
+            p for p in paths if p == root or p.startswith(root + os.sep)
+        )
+        if not self.change_running:
+            self.start_change_job()
 
-        # --- UPDATED SORTING LINE ---
-        # Sorts by name using the natural number logic
-        entries.sort(key=lambda e: natural_sort_key(e.name))
-        # ----------------------------
-
-        cards = []
-        for entry in entries:
-            if not entry.is_dir():
-                continue
-            # ... (rest of logic remains exactly the same) ...
-            sub_files = os.listdir(entry.path)
-            has_images = any(f.lower().endswith(VALID_EXTS) for f in sub_files)
-            has_subdirs = any(
-                os.path.isdir(os.path.join(entry.path, x)) for x in sub_files
+    def start_change_job(self):
+        """Re-lists the queued directories on the refresh pool, one batch at a time."""
+        if not self.pending_changes:
+            return
+        paths, self.pending_changes = self.pending_changes, set()
+        self.change_running = True
+        # The worker updates its own copy; the shown one stays read-only
+        fresh = LibraryCatalog(self.catalog.root)
+        fresh.nodes = dict(self.catalog.nodes)
+        self.refresh_pool.start(
+            _LibraryChangeJob(
+                self, self.refresh_generation, fresh, self.search_index, paths
             )
+        )
 
-            card = None
-            if has_images:
-                card = SchemaCard(
-                    entry.name, entry.path, is_folder=False, width=self.card_size
-                )
-            elif has_subdirs:
-                card = SchemaCard(
-                    entry.name, entry.path, is_folder=True, width=self.card_size
-                )
-
-            if card:
-                card.clicked.connect(self.on_card_clicked)
-                cards.append(card)
+    def apply_library_changes(self, generation, catalog, changed):
+        """Applies a re-listed batch to the catalog, cache and grid."""
+        if generation != self.refresh_generation:
+            return  # another library was opened meanwhile
+        self.change_running = False
+        if changed:
+            # Merged rather than swapped: populate_grid may have catalogued
+            # folders on demand while the worker ran
+            for path in changed:
+                node = catalog.nodes.get(path)
+                if node is None:
+                    self.catalog.nodes.pop(path, None)
+                else:
+                    self.catalog.nodes[path] = node
+            self.watcher.watch(p for p in changed if p in self.catalog.nodes)
+            self.apply_catalog_changes(changed)
+        self.start_change_job()
+
+    def apply_catalog_changes(self, changed):
+        """Drops stale thumbnails and updates the shown cards for changed dirs."""
+        root = self.catalog.root
+        cache = get_thumbnail_cache()
+        for path in changed:
+            node = self.catalog.nodes.get(path)
+            if node is None or not node.layers:
+                cache.invalidate(path)
+        # Stale signatures are replaced when the thumbnail is re-rendered
+        self.grid_model.drop_thumbnails(
+            p for p in changed if p in self.grid_model.rows_by_path
+        )
 
-        self.current_cards = cards
-        self.reflow_grid(cards)
+        if self.search_bar.text():
+            self.search_engine.submit(self.search_bar.text())
+            return
+        folder = os.path.normpath(self.current_path)
+        if not self.catalog.contains(folder):
+            # Current folder vanished: fall back to its closest surviving parent
+            while folder != root and not self.catalog.contains(folder):
+                folder = os.path.dirname(folder)
+            self.navigate_to(folder)
+            return
+        self.grid_model.sync_entries(self.folder_entries(folder))
+        self.schedule_thumbnails()
+
+    def set_entries(self, entries):
+        self.shown_query = None
+        self.thumb_loader.cancel_all()
+        self.grid_model.set_entries(entries)
+        self.grid_view.scrollToTop()
+        self.schedule_thumbnails()
+
+    def visible_rows(self, screens=0):
+        """
+        Row range currently inside the viewport, widened by screens viewport
+        heights above and below (grid cells are uniform).
+        """
+        count = self.grid_model.rowCount()
+        grid = self.grid_view.gridSize()
+        viewport = self.grid_view.viewport()
+        cols = max(1, viewport.width() // grid.width())
+        top = self.grid_view.verticalScrollBar().value()
+        margin = screens * viewport.height()
+        first = (max(0, top - margin) // grid.height()) * cols
+        last = ((top + viewport.height() + margin) // grid.height() + 1) * cols
+        return range(min(first, count), min(last, count))
+
+    def schedule_thumbnails(self):
+        """
+        Queues missing thumbnails, cards inside the viewport first, then
+        those within THUMB_AHEAD_SCREENS viewports of it; farther cards wait
+        until scrolling brings them near.
+        """
+        if not self.grid_model.entries or not self.isVisible():
+            return
+        model = self.grid_model
+        visible = self.visible_rows()
+        nearby = self.visible_rows(THUMB_AHEAD_SCREENS)
+        self.thumb_loader.retain({model.entries[row].path for row in nearby})
+        for row in visible:
+            if model.needs_thumbnail(row):
+                path = model.entries[row].path
+                self.thumb_loader.request(path, 1, self.catalog.layers(path))
+        for row in nearby:
+            if row not in visible and model.needs_thumbnail(row):
+                path = model.entries[row].path
+                self.thumb_loader.request(path, 0, self.catalog.layers(path))
+
+    def on_thumbnail_ready(self, path, levels):
+        self.grid_model.set_thumbnail(path, levels)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.restore_scheduled:  # first show; reports libraryReady
+            self.restore_scheduled = True
+            QTimer.singleShot(0, self.restore_library)
+        self.schedule_thumbnails()
+
+    def update_grid_size(self):
+        self.grid_delegate.card_size = self.card_size
+        self.grid_view.setGridSize(
+            QSize(self.card_size + 25, self.grid_delegate.card_height() + 25)
+        )
 
     def change_zoom(self, amount):
         self.card_size = max(120, min(400, self.card_size + amount))
-        for i in range(self.grid_layout.count()):
-            w = self.grid_layout.itemAt(i).widget()
-            if isinstance(w, SchemaCard):
-                w.set_card_size(self.card_size)
-        self.reflow_grid(self.current_cards)
-
-    def reflow_grid(self, cards):
-        while self.grid_layout.count():
-            self.grid_layout.takeAt(0)
-        container_width = self.width() - 320
-        max_cols = max(1, int(container_width / (self.card_size + 25)))
-        row, col = 0, 0
-        for card in cards:
-            self.grid_layout.addWidget(card, row, col)
-            col += 1
-            if col >= max_cols:
-                col = 0
-                row += 1
+        self.update_grid_size()
+        self.schedule_timer.start()
 
     def resizeEvent(self, event):
-        if hasattr(self, "current_cards"):
-            self.reflow_grid(self.current_cards)
         super().resizeEvent(event)
+        self.schedule_timer.start()
 
 
 class EditorScreen(QWidget):
     backClicked = pyqtSignal()
 
-    def __init__(self):
+    def __init__(self, thumb_loader=None):
         super().__init__()
+        # Hover previews go through the library's thumbnail queue when shared
+        self.thumb_loader = thumb_loader or ThumbnailLoader(self)
+        self.thumb_loader.previewReady.connect(self.on_preview_ready)
+        self.layer_rows = {}  # preview key -> LayerRow
+        self.schema_name = ""
+        self.layer_files = []
+        self.layer_items = {}  # file index -> TiledLayerItem
+        self.layer_state = {}  # file index -> [visible, opacity]
+        self.picked_layer = -1  # file index last clicked on the canvas
+        self.preview_item = None
+        self.view_fitted = False
+        self.canvas_rect = QRectF()  # full layer canvas, independent of trimming
+        self.loader = SchemaLoader(self)
+        self.loader.layerReady.connect(self.on_layer_ready)
+        self.loader.layerFailed.connect(self.update_progress)
+        self.loader.finished.connect(self.on_load_finished)
+        self.prefetcher = SchemaPrefetcher(self)
+        self.schema_keys = frozenset()  # layer cache keys of the shown schema
+        self.exporter = CompositeExporter(self)
+        self.exporter.progress.connect(self.on_export_progress)
+        self.exporter.finished.connect(self.on_export_finished)
+        self.export_dialog = None
+        self.sequence = []  # [(path, name)] of sibling schemas, natural order
+        self.sequence_index = -1
+        self.layers_for = lambda path: None
         self.setup_ui()
 
     def setup_ui(self):
@@ -699,6 +4037,7 @@ class EditorScreen(QWidget):
         tb_layout.setContentsMargins(20, 0, 20, 0)
         btn_back = QPushButton("← Back")
         btn_back.setObjectName("BackBtn")
+        btn_back.clicked.connect(self.unload)
         btn_back.clicked.connect(self.backClicked.emit)
         tb_layout.addWidget(btn_back)
         self.lbl_title = QLabel("Editor")
@@ -707,6 +4046,20 @@ class EditorScreen(QWidget):
         )
         tb_layout.addWidget(self.lbl_title)
         tb_layout.addStretch()
+        self.btn_prev = QPushButton("‹")
+        self.btn_prev.setObjectName("NavIconBtn")
+        self.btn_prev.setFixedSize(36, 36)
+        self.btn_prev.setToolTip("Previous schema (Page Up)")
+        self.btn_prev.clicked.connect(self.show_previous)
+        tb_layout.addWidget(self.btn_prev)
+        self.btn_next = QPushButton("›")
+        self.btn_next.setObjectName("NavIconBtn")
+        self.btn_next.setFixedSize(36, 36)
+        self.btn_next.setToolTip("Next schema (Page Down)")
+        self.btn_next.clicked.connect(self.show_next)
+        tb_layout.addWidget(self.btn_next)
+        QShortcut(QKeySequence(Qt.Key.Key_PageUp), self, self.show_previous)
+        QShortcut(QKeySequence(Qt.Key.Key_PageDown), self, self.show_next)
         layout.addWidget(toolbar)
 
         splitter = QSplitter(Qt.Orientation.Horizontal)
@@ -714,30 +4067,125 @@ class EditorScreen(QWidget):
         self.scene = QGraphicsScene()
         self.view = AnatomyCanvas(self.scene)
         splitter.addWidget(self.view)
+        self.flattener = LayerFlattener(self.scene, self.view, self)
+        self.view.viewScaleChanged.connect(self.flattener.view_changed)
+        self.view.layerHovered.connect(self.on_layer_hovered)
+        self.view.layerClicked.connect(self.select_layer)
 
         layers_panel = QFrame()
         layers_panel.setObjectName("Sidebar")
         layers_panel.setFixedWidth(300)
         lp_layout = QVBoxLayout(layers_panel)
         lp_layout.addWidget(QLabel("LAYERS", objectName="SectionLabel"))
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setFrameShape(QFrame.Shape.NoFrame)
-        scroll.setStyleSheet("background: transparent;")
+        self.layers_scroll = QScrollArea()
+        self.layers_scroll.setWidgetResizable(True)
+        self.layers_scroll.setFrameShape(QFrame.Shape.NoFrame)
+        # Not the rows themselves: they carry the canvas pick highlight
+        self.layers_scroll.setStyleSheet(
+            "QScrollArea, QScrollArea > QWidget > QWidget, QCheckBox, QLabel, QSlider"
+            " { background: transparent; }"
+        )
         self.layers_container = QWidget()
         self.layers_layout = QVBoxLayout(self.layers_container)
         self.layers_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-        scroll.setWidget(self.layers_container)
-        lp_layout.addWidget(scroll)
+        self.layers_scroll.setWidget(self.layers_container)
+        lp_layout.addWidget(self.layers_scroll)
         btn_reset = QPushButton("Reset View")
         btn_reset.setObjectName("SidebarBtn")
         btn_reset.clicked.connect(self.reset_view)
         lp_layout.addWidget(btn_reset)
+        btn_export = QPushButton("Export Image…")
+        btn_export.setObjectName("SidebarBtn")
+        btn_export.clicked.connect(self.export_image)
+        lp_layout.addWidget(btn_export)
         splitter.addWidget(layers_panel)
         layout.addWidget(splitter)
 
-    def load_schema(self, path, name):
+    def set_schema_sequence(self, sequence, layers_for):
+        """
+        Sibling schemas for next/previous navigation.
+        sequence: [(path, name)] in natural order; layers_for(path) returns
+        the catalog layer list (or None to list the folder).
+        """
+        self.sequence = sequence
+        self.layers_for = layers_for
+
+    def show_next(self):
+        self.show_adjacent(1)
+
+    def show_previous(self):
+        self.show_adjacent(-1)
+
+    def show_adjacent(self, step):
+        i = self.sequence_index + step
+        if self.sequence_index < 0 or not 0 <= i < len(self.sequence):
+            return
+        path, name = self.sequence[i]
+        self.load_schema(path, name, self.layers_for(path))
+
+    @traced("schema.load")
+    def load_schema(self, path, name, layers=None):
+        """
+        Shows the cached low-res composite right away, then adds each layer
+        (scene item + panel row) as the background loader decodes it.
+        """
+        self.unload()
+        self.schema_name = name
+        paths = [p for p, _ in self.sequence]
+        self.sequence_index = paths.index(path) if path in paths else -1
+        self.btn_prev.setEnabled(self.sequence_index > 0)
+        self.btn_next.setEnabled(0 <= self.sequence_index < len(self.sequence) - 1)
         self.lbl_title.setText(name)
+
+        if layers is None:
+            try:
+                layers = list_schema_layers(path)
+            except OSError:
+                layers = []
+        self.layer_files = [filename for filename, _, _ in layers]
+        self.schema_keys = frozenset(
+            (os.path.join(path, filename), size, mtime)
+            for filename, size, mtime in layers
+        )
+        if not self.layer_files:
+            return
+
+        # Low-resolution preview, stretched to the canvas size
+        thumb = cached_composite_thumbnail(path, layers)
+        size = schema_canvas_size(path, layers)
+        if size.isValid():
+            self.canvas_rect = QRectF(0, 0, size.width(), size.height())
+        if thumb is not None and size.isValid():
+            self.preview_item = QGraphicsPixmapItem(QPixmap.fromImage(thumb))
+            self.preview_item.setTransformationMode(
+                Qt.TransformationMode.SmoothTransformation
+            )
+            self.preview_item.setScale(size.width() / thumb.width())
+            self.preview_item.setZValue(-1)
+            self.scene.addItem(self.preview_item)
+            self.reset_view()
+            self.view_fitted = True
+
+        self.loader.load(path, layers)
+        self.update_progress()
+
+    def unload(self):
+        """Cancels any pending load and frees the current schema's images."""
+        self.loader.cancel()
+        self.prefetcher.cancel()
+        self.flattener.reset()
+        self.thumb_loader.drop_previews(self.layer_rows)
+        self.layer_rows = {}
+        for item in self.layer_items.values():
+            item.release_tiles()
+        self.layer_items = {}
+        self.layer_state = {}
+        self.picked_layer = -1
+        self.view.picker.clear()
+        self.view.hovered_layer = -1
+        self.preview_item = None
+        self.view_fitted = False
+        self.canvas_rect = QRectF()
         self.scene.clear()
 
         while self.layers_layout.count():
@@ -745,44 +4193,222 @@ class EditorScreen(QWidget):
             if child.widget():
                 child.widget().deleteLater()
 
-        files = [f for f in os.listdir(path) if f.lower().endswith(VALID_EXTS)]
-
-        # --- UPDATED SORTING LINE ---
-        files.sort(key=natural_sort_key)
-        # ----------------------------
+    @traced("schema.add_layer")
+    def on_layer_ready(self, i, pyramid):
+        filename = self.layer_files[i]
 
-        for i, filename in enumerate(files):
-            full_path = os.path.join(path, filename)
-            pixmap = QPixmap(full_path)
-            if pixmap.isNull():
-                continue
-
-            # Z-Value: Lower Number (-1-) gets lower Z (Background)
-            item = QGraphicsPixmapItem(pixmap)
-            item.setTransformationMode(Qt.TransformationMode.SmoothTransformation)
-            item.setZValue(i)
-            self.scene.addItem(item)
+        # Z-Value: Lower Number (-1-) gets lower Z (Background)
+        item = TiledLayerItem(pyramid)
+        item.setZValue(i)
+        self.scene.addItem(item)
 
-            clean_name = os.path.splitext(filename)[0].replace("_", " ").title()
+        clean_name = layer_display_name(filename)
 
-            row = LayerRow(clean_name, pixmap)
-            row.visibilityChanged.connect(lambda v, itm=item: itm.setVisible(v))
-            row.opacityChanged.connect(lambda o, itm=item: itm.setOpacity(o))
-
-            # Insert at 0 (Top of List) so higher numbers (Top Layers) appear at top of sidebar
-            self.layers_layout.insertWidget(0, row)
+        row = LayerRow(clean_name)
+        row.previewRequested.connect(
+            lambda p=pyramid, r=row: self.request_preview(p, r)
+        )
+        self.layer_rows[pyramid.key] = row
+        row.visibilityChanged.connect(lambda v, i=i: self.set_layer_state(i, visible=v))
+        row.opacityChanged.connect(lambda o, i=i: self.set_layer_state(i, opacity=o))
+        row.editStarted.connect(lambda i=i: self.flattener.begin_edit(i))
+        row.editFinished.connect(self.flattener.end_edit)
+        self.layer_state[i] = [True, 1.0]
+        self.view.picker.add(i, pyramid.pick_mask(), self.layer_state[i])
+
+        # Higher numbers (Top Layers) appear at top of sidebar
+        loaded = sorted(self.layer_items)
+        self.layer_items[i] = item
+        self.layers_layout.insertWidget(len(loaded) - bisect.bisect(loaded, i), row)
+
+        if self.canvas_rect.isEmpty():
+            size = pyramid.canvas_size
+            self.canvas_rect = QRectF(0, 0, size.width(), size.height())
+        if not self.view_fitted:
+            self.reset_view()
+            self.view_fitted = True
+        self.update_progress()
+
+    def request_preview(self, pyramid, row):
+        image = self.thumb_loader.preview(pyramid.key, pyramid)
+        if image is not None:
+            row.set_preview(image)
+
+    def on_preview_ready(self, key, image):
+        row = self.layer_rows.get(key)
+        if row is not None:
+            row.set_preview(image)
+
+    def set_layer_state(self, i, visible=None, opacity=None):
+        state = self.layer_state[i]
+        if visible is not None:
+            state[0] = visible
+        if opacity is not None:
+            state[1] = opacity
+        if self.flattener.enabled:
+            self.flattener.update()
+        else:
+            self.layer_items[i].setVisible(state[0])
+            self.layer_items[i].setOpacity(state[1])
+
+    def layer_row(self, i):
+        item = self.layer_items.get(i)
+        return self.layer_rows.get(item.pyramid.key) if item is not None else None
+
+    def on_layer_hovered(self, i):
+        for row in self.layer_rows.values():
+            row.set_highlight("hovered", False)
+        row = self.layer_row(i)
+        if row is not None:
+            row.set_highlight("hovered", True)
+
+    def select_layer(self, i):
+        """Highlights the row of the layer clicked on the canvas (-1 clears)."""
+        old = self.layer_row(self.picked_layer)
+        if old is not None:
+            old.set_highlight("picked", False)
+        self.picked_layer = i
+        row = self.layer_row(i)
+        if row is not None:
+            row.set_highlight("picked", True)
+            self.layers_scroll.ensureWidgetVisible(row)
+
+    def update_progress(self, *args):
+        if self.loader.is_loading():
+            done = len(self.layer_files) - self.loader.remaining
+            self.lbl_title.setText(
+                f"{self.schema_name}  ·  loading {done}/{len(self.layer_files)}"
+            )
+        else:
+            self.lbl_title.setText(self.schema_name)
+
+    def on_load_finished(self):
+        if self.preview_item is not None:
+            self.scene.removeItem(self.preview_item)
+            self.preview_item = None
+        self.update_progress()
+        self.flattener.set_layers(
+            self.layer_items, self.layer_state, self.canvas_rect.size().toSize()
+        )
+        self.prefetch_neighbors()
 
-        self.reset_view()
+    def prefetch_neighbors(self):
+        """Decodes the next, then the previous schema while this one is viewed."""
+        if self.sequence_index < 0:
+            return
+        schemas = []
+        for i in (self.sequence_index + 1, self.sequence_index - 1):
+            if 0 <= i < len(self.sequence):
+                path = self.sequence[i][0]
+                layers = self.layers_for(path)
+                if layers is None:
+                    try:
+                        layers = list_schema_layers(path)
+                    except OSError:
+                        continue
+                schemas.append((path, layers))
+        self.prefetcher.prefetch(schemas, self.schema_keys)
 
     def reset_view(self):
         if self.scene.items():
-            # Get the bounding rect of all items in the scene
-            rect = self.scene.itemsBoundingRect()
+            # Fit the layer canvas (items alone may be trimmed smaller)
+            rect = self.canvas_rect.united(self.scene.itemsBoundingRect())
             # Fit the view to this rect, keeping aspect ratio
             self.view.fitInView(rect, Qt.AspectRatioMode.KeepAspectRatio)
             # Zoom out slightly (90%) so it's not touching the edges
             self.view.scale(0.9, 0.9)
 
+    def export_image(self):
+        """Saves the loaded layers as shown (visibility, opacity) at 1-4x."""
+        size = self.canvas_rect.size().toSize()
+        layers = [
+            (self.layer_items[i].pyramid, opacity)
+            for i, (visible, opacity) in sorted(self.layer_state.items())
+            if visible and opacity > 0
+        ]
+        if not layers or size.isEmpty():
+            return
+        w, h = size.width(), size.height()
+        choices = [f"{n}×  ({w * n} × {h * n} px)" for n in (1, 2, 3, 4)]
+        choice, ok = QInputDialog.getItem(
+            self, "Export Image", "Resolution:", choices, 0, False
+        )
+        if not ok:
+            return
+        scale = choices.index(choice) + 1
+        folder = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.PicturesLocation
+        )
+        dest, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Image",
+            os.path.join(folder, f"{self.schema_name}.png"),
+            "PNG image (*.png);;Tiled TIFF (*.tif *.tiff)",
+        )
+        if not dest:
+            return
+        if not dest.lower().endswith(EXPORT_FORMATS):
+            dest += ".png"
+        self.export_dialog = QProgressDialog(
+            f"Exporting {os.path.basename(dest)}…", "Cancel", 0, 0, self
+        )
+        self.export_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        self.export_dialog.setMinimumDuration(300)
+        self.export_dialog.canceled.connect(self.cancel_export)
+        self.exporter.export(layers, size, dest, scale)
+
+    def cancel_export(self):
+        self.exporter.cancel()
+        self.export_dialog = None
+
+    def on_export_progress(self, done, total):
+        if self.export_dialog is not None:
+            self.export_dialog.setMaximum(total)
+            self.export_dialog.setValue(done)
+
+    def on_export_finished(self, dest, error):
+        if self.export_dialog is not None:
+            self.export_dialog.reset()
+            self.export_dialog = None
+        if error:
+            QMessageBox.warning(self, "Export Image", f"Could not export: {error}")
+
+
+class StartupProfiler(QObject):
+    """
+    Startup milestones in ms since the module began importing: first paint
+    of the window, restored library cards shown, library re-validated and
+    indexed. With --measure-startup they are printed as one JSON line and
+    the app quits once the library is ready (usable on packaged builds).
+    """
+
+    def __init__(self, window, quit_when_ready=False):
+        super().__init__(window)
+        self.marks = {}
+        self.quit_when_ready = quit_when_ready
+        window.library.installEventFilter(self)
+        window.library.libraryShown.connect(lambda: self.mark("library_shown"))
+        window.library.libraryReady.connect(lambda: self.mark("library_ready"))
+
+    def mark(self, name):
+        if name in self.marks:
+            return
+        now = time.perf_counter()
+        self.marks[name] = round((now - _START_TIME) * 1000, 1)
+        if TRACER.enabled:
+            TRACER.add(f"startup.{name}", int(_START_TIME * 1e9), int(now * 1e9))
+        if self.quit_when_ready and "library_ready" in self.marks:
+            if "first_paint" in self.marks:
+                print(json.dumps(self.marks), flush=True)
+                QApplication.quit()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            # Next loop iteration: this paint has been flushed to the screen
+            QTimer.singleShot(0, lambda: self.mark("first_paint"))
+        return False
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -792,7 +4418,7 @@ class MainWindow(QMainWindow):
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
         self.library = LibraryScreen()
-        self.editor = EditorScreen()
+        self.editor = EditorScreen(self.library.thumb_loader)
         self.stack.addWidget(self.library)
         self.stack.addWidget(self.editor)
 
@@ -800,6 +4426,10 @@ class MainWindow(QMainWindow):
         self.editor.backClicked.connect(self.open_library)
         self.library.themeChanged.connect(self.apply_theme)
 
+        self.hud = PerfHud(self)
+        QShortcut(QKeySequence("Ctrl+Shift+H"), self, self.hud.toggle)
+        QShortcut(QKeySequence("Ctrl+Shift+T"), self, self.toggle_tracing)
+
         # Initial Theme Apply
         self.apply_theme(self.library.current_theme)
 
@@ -814,8 +4444,55 @@ class MainWindow(QMainWindow):
                 QBrush(QColor(THEMES[theme_name]["bg_main"]))
             )
 
+    def toggle_tracing(self):
+        if not TRACER.enabled:
+            TRACER.start()
+            return
+        TRACER.stop()
+        path = os.path.join(
+            get_cache_dir(), time.strftime("trace-%Y%m%d-%H%M%S.json")
+        )
+        try:
+            count = TRACER.export(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Trace", f"Could not write trace: {e}")
+            return
+        QMessageBox.information(
+            self,
+            "Trace saved",
+            f"{count} spans written to\n{path}\n\n"
+            "Open it in chrome://tracing or ui.perfetto.dev.",
+        )
+
+    def closeEvent(self, event):
+        self.shutdown()
+        super().closeEvent(event)
+
+    def shutdown(self):
+        """
+        Stops all background work. Workers run Python code, so a pool must
+        be drained before its destructor blocks the GUI thread holding the GIL.
+        """
+        self.editor.unload()
+        self.library.thumb_loader.cancel_all()
+        self.library.search_engine.cancel()
+        for pool in self.findChildren(QThreadPool):
+            pool.clear()
+            pool.waitForDone()
+
     def open_editor(self, path, name):
-        self.editor.load_schema(path, name)
+        self.library.thumb_loader.cancel_all()
+        catalog = self.library.catalog
+        if catalog:
+            siblings = [
+                (p, n)
+                for n, p, kind in catalog.children(os.path.dirname(path))
+                if kind == "schema"
+            ]
+            self.editor.set_schema_sequence(siblings, catalog.layers)
+        else:
+            self.editor.set_schema_sequence([], lambda p: None)
+        self.editor.load_schema(path, name, catalog.layers(path) if catalog else None)
         self.stack.setCurrentIndex(1)
         # Ensure canvas background matches theme
         self.editor.view.setBackgroundBrush(
@@ -826,11 +4503,276 @@ class MainWindow(QMainWindow):
         self.stack.setCurrentIndex(0)
 
 
+# --- HEADLESS CACHE WARMING ---
+def _warm_init(pillow=False):
+    # Worker processes only paint into QImages, but image plugins and
+    # QPainter still expect an application object
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    global _warm_app, _pillow_decoder
+    _warm_app = QApplication.instance() or QApplication([APP_NAME])
+    # Already one process per core: decode inline, never nest a pool
+    _pillow_decoder = PillowDecoder(0) if pillow else False
+
+
+def _warm_thumbnail(job):
+    path, layers = job
+    try:
+        image = composite_thumbnail_image(path, layers)
+        data = image_to_png(image) if image is not None else None
+    except Exception:
+        data = None
+    return path, layer_signature(layers), data, sum(size for _, size, _ in layers)
+
+
+def warm_caches(root, jobs, out=sys.stderr, pillow=False):
+    """
+    Pre-builds the library catalog and every card thumbnail under root,
+    rendering on `jobs` processes (decoding with Pillow if pillow).
+    Thumbnails are written as they finish and cached ones are skipped, so
+    an interrupted run resumes where it stopped. Returns (rendered,
+    skipped, failed).
+    """
+    started = time.perf_counter()
+    catalog = LibraryCatalog.open(root)
+    elapsed = time.perf_counter() - started
+    print(f"Catalog: {len(catalog.nodes)} folders in {elapsed:.1f}s", file=out)
+
+    cache = get_thumbnail_cache()
+    todo = []
+    skipped = 0
+    for path, node in catalog.nodes.items():
+        if node.kind != "schema":
+            continue
+        if cache.contains(path, layer_signature(node.layers)):
+            skipped += 1
+        else:
+            todo.append((path, node.layers))
+    todo.sort(key=lambda job: natural_sort_key(job[0]))
+    print(f"Thumbnails: {len(todo)} to render, {skipped} already cached", file=out)
+
+    rendered = failed = 0
+    source_bytes = 0
+    t0 = last = time.perf_counter()
+    if todo:
+        import multiprocessing  # deferred: only the warming CLI needs it
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(jobs, initializer=_warm_init, initargs=(pillow,)) as pool:
+            results = pool.imap_unordered(_warm_thumbnail, todo)
+            for done, (path, signature, data, nbytes) in enumerate(results, 1):
+                if data is None:
+                    failed += 1
+                else:
+                    cache.put(path, signature, data)
+                    rendered += 1
+                source_bytes += nbytes
+                now = time.perf_counter()
+                if now - last >= 0.5 or done == len(todo):
+                    last = now
+                    rate = done / (now - t0)
+                    print(
+                        f"\r[{done}/{len(todo)}] {rate:.1f} schemas/s, "
+                        f"{source_bytes / (now - t0) / 1e6:.1f} MB/s read, "
+                        f"ETA {(len(todo) - done) / rate:.0f}s   ",
+                        end="",
+                        file=out,
+                        flush=True,
+                    )
+        print(file=out)
+    print(
+        f"Done in {time.perf_counter() - started:.1f}s: {rendered} rendered, "
+        f"{skipped} skipped, {failed} unreadable",
+        file=out,
+    )
+    return rendered, skipped, failed
+
+
+def warm_main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog=APP_NAME, description="Pre-build library caches without a window."
+    )
+    parser.add_argument("--warm", metavar="ROOT", required=True, help="library folder")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="worker processes (default: one per core)",
+    )
+    parser.add_argument(
+        "--pillow", action="store_true", help="decode with Pillow instead of Qt"
+    )
+    args = parser.parse_args(argv)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(sys.argv[:1])  # noqa: F841 (QSettings / image plugins)
+    if not os.path.isdir(args.warm):
+        parser.error(f"not a directory: {args.warm}")
+    if args.pillow and not PillowDecoder.available():
+        parser.error("--pillow needs Pillow installed")
+    try:
+        warm_caches(args.warm, max(1, args.jobs), pillow=args.pillow)
+    except KeyboardInterrupt:
+        print("\nInterrupted; run again to resume.", file=sys.stderr)
+        return 130
+    return 0
+
+
+def pack_main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog=APP_NAME,
+        description=f"Convert schema folders into single-file {PACK_EXT} packs.",
+    )
+    parser.add_argument(
+        "--pack",
+        metavar="SRC",
+        required=True,
+        help="schema folder, or a library folder to convert every schema in",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="zlib-compress pixels (smaller, but decoded on open)",
+    )
+    args = parser.parse_args(argv)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(sys.argv[:1])  # noqa: F841 (image plugins)
+    src = os.path.normpath(args.pack)
+    if not os.path.isdir(src):
+        parser.error(f"not a directory: {src}")
+
+    schemas = []
+    for folder, dirs, _ in os.walk(src):
+        dirs.sort(key=natural_sort_key)
+        layers = list_layer_files(folder)
+        if layers:
+            schemas.append((folder, layers))
+    packed = skipped = failed = 0
+    for i, (folder, layers) in enumerate(schemas, 1):
+        dest = folder + PACK_EXT
+        try:
+            newest = max(mtime for _, _, mtime in layers)
+            if os.path.exists(dest) and os.stat(dest).st_mtime_ns >= newest:
+                skipped += 1
+                continue
+            t0 = time.perf_counter()
+            write_schema_pack(folder, dest, compress=args.compress)
+            elapsed = time.perf_counter() - t0
+            size = os.path.getsize(dest) / 1e6
+            print(
+                f"[{i}/{len(schemas)}] {dest} ({size:.1f} MB, {elapsed:.1f}s)",
+                file=sys.stderr,
+            )
+            packed += 1
+        except KeyboardInterrupt:
+            print("\nInterrupted; run again to resume.", file=sys.stderr)
+            return 130
+        except (OSError, ValueError) as e:
+            print(f"[{i}/{len(schemas)}] {folder}: {e}", file=sys.stderr)
+            failed += 1
+    print(
+        f"Done: {packed} packed, {skipped} up to date, {failed} failed",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+def export_main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog=APP_NAME, description="Export flattened schemas without a window."
+    )
+    parser.add_argument(
+        "--export",
+        metavar="SRC",
+        required=True,
+        help="schema folder or pack, or a collection to export every schema in",
+    )
+    parser.add_argument("--out", metavar="DIR", required=True, help="output folder")
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="output / native size (default 1)"
+    )
+    parser.add_argument("--format", choices=("png", "tif"), default="png")
+    args = parser.parse_args(argv)
+    if args.scale <= 0:
+        parser.error("--scale must be positive")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(sys.argv[:1])  # noqa: F841 (QPainter / image plugins)
+    src = os.path.normpath(args.export)
+
+    if is_schema_pack(src):
+        schemas = [(src, None)]
+    elif os.path.isdir(src):
+        catalog = LibraryCatalog(src)
+        catalog.refresh()
+        schemas = []
+        for path, node in catalog.nodes.items():
+            if node.kind == "schema" and not catalog.is_hidden(path):
+                schemas.append((path, node.layers))
+            for filename, _, _, _ in node.packs:
+                pack_path = os.path.join(path, filename)
+                schemas.append((pack_path, catalog.layers(pack_path)))
+        schemas.sort(key=lambda schema: natural_sort_key(schema[0]))
+    else:
+        parser.error(f"not a schema or folder: {src}")
+
+    exported = failed = 0
+    for i, (path, layers) in enumerate(schemas, 1):
+        rel = os.path.relpath(path, src)
+        if rel == ".":
+            rel = os.path.basename(src)
+        if rel.lower().endswith(PACK_EXT):
+            rel = rel[: -len(PACK_EXT)]
+        dest = os.path.join(args.out, f"{rel}.{args.format}")
+        try:
+            t0 = time.perf_counter()
+            pyramids, canvas = load_export_layers(path, layers)
+            if not pyramids:
+                raise ValueError("no readable layers")
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            export_composite(pyramids, canvas, dest, args.scale)
+            del pyramids
+            print(
+                f"[{i}/{len(schemas)}] {dest} ({time.perf_counter() - t0:.1f}s)",
+                file=sys.stderr,
+            )
+            exported += 1
+        except KeyboardInterrupt:
+            print("\nInterrupted.", file=sys.stderr)
+            return 130
+        except (OSError, ValueError) as e:
+            print(f"[{i}/{len(schemas)}] {path}: {e}", file=sys.stderr)
+            failed += 1
+    print(f"Done: {exported} exported, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
 if __name__ == "__main__":
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+
+        multiprocessing.freeze_support()  # --warm worker processes
+    if "--warm" in sys.argv[1:]:
+        sys.exit(warm_main(sys.argv[1:]))
+    if "--pack" in sys.argv[1:]:
+        sys.exit(pack_main(sys.argv[1:]))
+    if "--export" in sys.argv[1:]:
+        sys.exit(export_main(sys.argv[1:]))
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     if hasattr(Qt.ApplicationAttribute, "AA_UseHighDpiPixmaps"):
         app.setAttribute(Qt.ApplicationAttribute.AA_UseHighDpiPixmaps)
+    QPixmapCache.setCacheLimit(TILE_CACHE_MB * 1024)
+    trace_path = os.environ.get("ANATO_TRACE")
+    if trace_path:
+        TRACER.start()
+        app.aboutToQuit.connect(lambda: TRACER.export(trace_path))
     window = MainWindow()
+    profiler = StartupProfiler(window, "--measure-startup" in sys.argv[1:])
     window.show()
+    if os.environ.get("ANATO_HUD"):
+        window.hud.set_active(True)
     sys.exit(app.exec())
@@ -0,0 +1,626 @@
+"""
+Headless performance benchmarks for AnatoViewer.
+
+    python benchmark.py
+    python benchmark.py --schemas 400 --layers 8 --size 3000x2000 --format jpg
+    python benchmark.py --out new.json --compare baseline.json
+    python benchmark.py --only catalog navigation --fs-latency 5
+    python benchmark.py --only decode thumbnails --decode-processes 16
+
+A synthetic library is generated (or reused with --library), then every
+benchmark runs in its own process under the offscreen Qt platform with an
+empty cache directory, so wall times and peak RSS are comparable between
+runs. Timings are medians over the measured operations. Results are
+written as JSON; --compare prints the relative change of every metric.
+--fs-latency adds a delay to every directory listing and stat, standing
+in for a network-mounted library. --decode-processes switches decoding to
+the Pillow process pool with that many workers.
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCHMARKS = (
+    "catalog",
+    "navigation",
+    "search",
+    "thumbnails",
+    "decode",
+    "schema_open",
+    "zoom",
+)
+ORGANS = ("Coeur", "Poumon", "Rein", "Foie", "Cerveau", "Estomac", "Pancreas", "Rate")
+PARTS = ("Os", "Muscles", "Arteres", "Veines", "Nerfs", "Organes", "Legendes")
+
+
+# --- SYNTHETIC LIBRARY ---
+def generate_library(root, depth, fanout, schemas, layers, size, fmt, seed=0):
+    """
+    Writes a library of `schemas` schemas spread over a folder tree of
+    `depth` levels with `fanout` children each. Layer 1 is an opaque
+    background; the others are transparent except for a few shapes at a
+    random offset (JPEG layers are opaque, it has no alpha channel).
+    """
+    from PyQt6.QtGui import QImage, QPainter, QColor, QPen
+    from PyQt6.QtCore import Qt, QRect
+
+    rng = random.Random(seed)
+    width, height = size
+    leaves = [root]
+    for level in range(depth):
+        label = "Partie Prof" if level == 0 else "Chapitre"
+        leaves = [
+            os.path.join(parent, f"{label} {i + 1}")
+            for parent in leaves
+            for i in range(fanout)
+        ]
+
+    for n in range(schemas):
+        folder = os.path.join(
+            leaves[n % len(leaves)], f"Schema {n + 1} {ORGANS[n % len(ORGANS)]}"
+        )
+        os.makedirs(folder, exist_ok=True)
+        for l in range(layers):
+            image = QImage(width, height, QImage.Format.Format_ARGB32_Premultiplied)
+            if l == 0 or fmt != "png":
+                image.fill(Qt.GlobalColor.white)
+            else:
+                image.fill(Qt.GlobalColor.transparent)
+            p = QPainter(image)
+            p.setRenderHint(QPainter.RenderHint.Antialiasing)
+            if l == 0:
+                p.setPen(QPen(QColor("#dddddd"), max(1, width // 800)))
+                for x in range(0, width, max(1, width // 20)):
+                    p.drawLine(x, 0, x, height)
+            else:
+                w, h = width // 3, height // 3
+                box = QRect(rng.randrange(width - w), rng.randrange(height - h), w, h)
+                color = QColor.fromHsv(rng.randrange(360), 180, 220)
+                p.setPen(QPen(color.darker(), max(1, width // 400)))
+                p.setBrush(color)
+                p.drawEllipse(box)
+                p.drawRect(box.adjusted(w // 4, h // 4, -w // 4, -h // 4))
+            p.end()
+            name = f"-{l + 1}-{PARTS[l % len(PARTS)]}.{fmt}"
+            image.save(os.path.join(folder, name), None, 90)
+
+
+def ensure_library(path, params):
+    """Reuses path when it was generated with the same parameters."""
+    marker = os.path.join(path, ".bench-params.json")
+    try:
+        with open(marker, "r", encoding="utf-8") as f:
+            if json.load(f) == params:
+                return False
+    except (OSError, ValueError):
+        pass
+    if os.path.isdir(path) and os.listdir(path):
+        sys.exit(f"{path} is not empty and was not generated with these parameters")
+    os.makedirs(path, exist_ok=True)
+    generate_library(
+        path,
+        params["depth"],
+        params["fanout"],
+        params["schemas"],
+        params["layers"],
+        tuple(params["size"]),
+        params["format"],
+        params["seed"],
+    )
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(params, f)
+    return True
+
+
+# --- MEASUREMENT HELPERS ---
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def median_ms(samples):
+    return round(statistics.median(samples) * 1000, 3) if samples else None
+
+
+def per_second(count, seconds):
+    return round(count / seconds, 2) if seconds > 0 else None
+
+
+WINDOWS = []  # kept alive until run_child shuts them down
+
+
+def open_window(av):
+    window = av.MainWindow()
+    window.resize(1280, 850)
+    window.show()
+    WINDOWS.append(window)
+    return window
+
+
+def spin(app, until, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while not until() and time.perf_counter() < deadline:
+        app.processEvents()
+
+
+def open_library(app, library, root):
+    """Opens root and waits until it is scanned and indexed."""
+    ready = []
+    library.libraryReady.connect(lambda: ready.append(True))
+    library.set_root_library(root)
+    spin(app, lambda: ready)
+
+
+# --- SLOW FILESYSTEM STAND-IN ---
+class _SlowEntry:
+    """DirEntry whose stat() pays the latency; the entry type is free."""
+
+    def __init__(self, entry, latency):
+        self._entry = entry
+        self._latency = latency
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def stat(self, *args, **kwargs):
+        time.sleep(self._latency)
+        return self._entry.stat(*args, **kwargs)
+
+
+class _SlowScandir:
+    def __init__(self, it, latency):
+        self._it = it
+        self._latency = latency
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+    def __iter__(self):
+        for entry in self._it:
+            yield _SlowEntry(entry, self._latency)
+
+
+def inject_fs_latency(ms):
+    """
+    Makes os.stat / os.scandir (and DirEntry.stat) sleep ms per call,
+    roughly one network round trip each, like an SMB or NFS share.
+    """
+    latency = ms / 1000
+    real_stat, real_scandir = os.stat, os.scandir
+
+    def stat(*args, **kwargs):
+        time.sleep(latency)
+        return real_stat(*args, **kwargs)
+
+    def scandir(*args, **kwargs):
+        time.sleep(latency)
+        return _SlowScandir(real_scandir(*args, **kwargs), latency)
+
+    os.stat, os.scandir = stat, scandir
+
+
+# --- BENCHMARKS (each runs in a child process) ---
+def bench_catalog(av, app, root, opts):
+    t = time.perf_counter()
+    catalog = av.LibraryCatalog(root)
+    catalog.refresh()
+    cold = time.perf_counter() - t
+    catalog.save()
+    t = time.perf_counter()
+    warm_catalog = av.LibraryCatalog.open(root)
+    warm = time.perf_counter() - t
+
+    # Cold open in the UI: cards stream in while the scan is still running
+    os.remove(catalog.cache_file)
+    window = open_window(av)
+    library = window.library
+    grid = library.grid_model
+    t = time.perf_counter()
+    library.set_root_library(root)
+    spin(app, lambda: grid.entries)
+    first_cards = time.perf_counter() - t
+    spin(app, lambda: library.search_index is not None)
+    ready = time.perf_counter() - t
+    return {
+        "folders": len(warm_catalog.nodes),
+        "cold_scan_ms": round(cold * 1000, 3),
+        "warm_open_ms": round(warm * 1000, 3),
+        "first_cards_ms": round(first_cards * 1000, 3),
+        "library_ready_ms": round(ready * 1000, 3),
+    }
+
+
+def bench_navigation(av, app, root, opts):
+    window = open_window(av)
+    library = window.library
+    t = time.perf_counter()
+    open_library(app, library, root)
+    library.grid_view.viewport().repaint()
+    first = time.perf_counter() - t
+
+    folders = [
+        path
+        for path, node in library.catalog.nodes.items()
+        if node.kind == "collection" or path == library.catalog.root
+    ]
+    samples = []
+    for _ in range(opts.repeat):
+        for path in folders:
+            t = time.perf_counter()
+            library.navigate_to(path)
+            library.grid_view.viewport().repaint()
+            app.processEvents()
+            samples.append(time.perf_counter() - t)
+
+    # Card zoom over the largest folder
+    library.navigate_to(max(folders, key=lambda p: len(library.catalog.children(p))))
+    spin(app, lambda: False, 0.5)
+    zoom_samples = []
+    for step in [20] * 10 + [-20] * 10:
+        t = time.perf_counter()
+        library.change_zoom(step)
+        library.grid_view.viewport().repaint()
+        zoom_samples.append(time.perf_counter() - t)
+    return {
+        "folders": len(folders),
+        "open_library_ms": round(first * 1000, 3),
+        "navigate_ms": median_ms(samples),
+        "navigate_fps": per_second(len(samples), sum(samples)),
+        "card_zoom_fps": per_second(len(zoom_samples), sum(zoom_samples)),
+    }
+
+
+def bench_search(av, app, root, opts):
+    window = open_window(av)
+    library = window.library
+    open_library(app, library, root)
+    catalog = library.catalog
+
+    t = time.perf_counter()
+    av.SearchIndex.from_catalog(catalog)
+    build = time.perf_counter() - t
+
+    queries = ["coeur", "schema 1", "rein", "chapitre", "os", "xyz", "c", "prof 2"]
+    samples = []
+    for _ in range(opts.repeat):
+        for q in queries:
+            t = time.perf_counter()
+            library.perform_universal_search(q)
+            library.grid_view.viewport().repaint()
+            samples.append(time.perf_counter() - t)
+
+    # Typing: one search + repaint per keystroke, narrowing incrementally
+    keys = []
+    for _ in range(opts.repeat):
+        previous = None
+        for i in range(1, len("cerveau") + 1):
+            t = time.perf_counter()
+            found = library.search_index.search("cerveau"[:i], previous)
+            results, previous = found
+            library.show_search_results("cerveau"[:i], results)
+            library.grid_view.viewport().repaint()
+            keys.append(time.perf_counter() - t)
+    return {
+        "index_build_ms": round(build * 1000, 3),
+        "query_ms": median_ms(samples),
+        "keystroke_ms": median_ms(keys),
+        "keystrokes_per_s": per_second(len(keys), sum(keys)),
+    }
+
+
+def bench_thumbnails(av, app, root, opts):
+    catalog = av.LibraryCatalog.open(root)
+    schemas = sorted(
+        (path, node.layers)
+        for path, node in catalog.nodes.items()
+        if node.kind == "schema"
+    )[: opts.limit]
+    cold, cached = [], []
+    for path, layers in schemas:
+        t = time.perf_counter()
+        av.render_composite_thumbnail(path, layers)
+        cold.append(time.perf_counter() - t)
+    for path, layers in schemas:
+        t = time.perf_counter()
+        av.render_composite_thumbnail(path, layers)
+        cached.append(time.perf_counter() - t)
+    return {
+        "schemas": len(schemas),
+        "render_ms": median_ms(cold),
+        "cached_ms": median_ms(cached),
+        "schemas_per_s": per_second(len(cold), sum(cold)),
+    }
+
+
+def bench_decode(av, app, root, opts):
+    from concurrent.futures import ThreadPoolExecutor
+
+    catalog = av.LibraryCatalog.open(root)
+    schemas = sorted(p for p, n in catalog.nodes.items() if n.kind == "schema")
+    paths = [
+        os.path.join(path, name)
+        for path in schemas[: opts.limit]
+        for name, _, _ in catalog.nodes[path].layers
+    ]
+    # As many layers in flight as the SchemaLoader decodes at once
+    threads = max(2, av.QThread.idealThreadCount() - 1)
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(av.load_layer_pyramid, paths[:threads]))  # start workers
+        t = time.perf_counter()
+        pixels = sum(p.width * p.height for p in pool.map(av.load_layer_pyramid, paths))
+        elapsed = time.perf_counter() - t
+    return {
+        "layers": len(paths),
+        "layers_per_s": per_second(len(paths), elapsed),
+        "mpx_per_s": round(pixels / elapsed / 1e6, 1),
+    }
+
+
+def bench_schema_open(av, app, root, opts):
+    window = open_window(av)
+    open_library(app, window.library, root)
+    catalog = window.library.catalog
+    schemas = sorted(p for p, n in catalog.nodes.items() if n.kind == "schema")
+    schemas = schemas[: max(1, min(opts.limit, 10))]
+    editor = window.editor
+    first_layer, cold, warm = [], [], []
+    for samples in (cold, warm):
+        for path in schemas:
+            if samples is cold:
+                av.get_layer_cache().clear()
+            t = time.perf_counter()
+            window.open_editor(path, os.path.basename(path))
+            if samples is cold:
+                spin(app, lambda: editor.layer_items)
+                first_layer.append(time.perf_counter() - t)
+            spin(app, lambda: not editor.loader.is_loading())
+            editor.view.viewport().repaint()
+            samples.append(time.perf_counter() - t)
+            editor.prefetcher.cancel()
+            window.open_library()
+    return {
+        "schemas": len(schemas),
+        "first_layer_ms": median_ms(first_layer),
+        "open_cold_ms": median_ms(cold),
+        "open_warm_ms": median_ms(warm),
+    }
+
+
+def bench_zoom(av, app, root, opts):
+    window = open_window(av)
+    open_library(app, window.library, root)
+    catalog = window.library.catalog
+    path = min(p for p, n in catalog.nodes.items() if n.kind == "schema")
+    window.open_editor(path, os.path.basename(path))
+    editor = window.editor
+    view = editor.view
+    spin(app, lambda: not editor.loader.is_loading())
+    spin(app, lambda: False, 0.5)  # composites / tiles settle
+
+    def frames(step):
+        samples = []
+        for _ in range(opts.repeat):
+            for i in range(40):
+                t = time.perf_counter()
+                step(i)
+                view.viewport().repaint()
+                samples.append(time.perf_counter() - t)
+        return samples
+
+    def zoom(i):
+        view.begin_interaction()
+        factor = 1.15 if (i // 10) % 2 == 0 else 1 / 1.15
+        view.scale(factor, factor)
+
+    def pan(i):
+        bar = view.horizontalScrollBar()
+        bar.setValue(bar.value() + (25 if (i // 10) % 2 == 0 else -25))
+
+    zoom_samples = frames(zoom)
+    view.end_interaction()
+    editor.reset_view()
+    view.scale(4, 4)
+    spin(app, lambda: False, 0.5)
+    pan_samples = frames(pan)
+    view.end_interaction()
+    t = time.perf_counter()
+    view.viewport().repaint()
+    idle = time.perf_counter() - t
+    return {
+        "zoom_fps": per_second(len(zoom_samples), sum(zoom_samples)),
+        "zoom_frame_ms": median_ms(zoom_samples),
+        "pan_fps": per_second(len(pan_samples), sum(pan_samples)),
+        "pan_frame_ms": median_ms(pan_samples),
+        "smooth_repaint_ms": round(idle * 1000, 3),
+    }
+
+
+def isolate_settings(av, path):
+    """
+    Points every QSettings the app opens at an ini file at path, so runs
+    (LibraryScreen saves root_path) never touch the user's real settings,
+    even when killed.
+    """
+
+    class BenchSettings(av.QSettings):
+        def __init__(self, *args):
+            super().__init__(path, av.QSettings.Format.IniFormat)
+
+    av.QSettings = BenchSettings
+
+
+def run_child(name, root, opts):
+    sys.path.insert(0, HERE)
+    import anatovieer_v2 as av
+
+    if opts.fs_latency:
+        inject_fs_latency(opts.fs_latency)
+    isolate_settings(av, os.path.join(os.environ["ANATO_CACHE_DIR"], "settings.ini"))
+    app = av.QApplication([av.APP_NAME])
+    settings = av.QSettings(av.ORGANIZATION_NAME, av.DOMAIN_NAME)
+    settings.setValue("decode_processes", opts.decode_processes)
+    try:
+        result = globals()[f"bench_{name}"](av, app, root, opts)
+    finally:
+        for window in WINDOWS:
+            window.close()
+    result["wall_s"] = round(time.perf_counter() - STARTED, 3)
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+# --- DRIVER ---
+def run_benchmark(name, root, opts):
+    with tempfile.TemporaryDirectory(prefix="anato-bench-cache-") as cache:
+        env = dict(os.environ, QT_QPA_PLATFORM="offscreen", ANATO_CACHE_DIR=cache)
+        cmd = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--child",
+            name,
+            "--library",
+            root,
+            "--repeat",
+            str(opts.repeat),
+            "--limit",
+            str(opts.limit),
+            "--fs-latency",
+            str(opts.fs_latency),
+            "--decode-processes",
+            str(opts.decode_processes),
+        ]
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline):
+    print(f"\n{'metric':<36}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, metrics in results["results"].items():
+        old = baseline.get("results", {}).get(name, {})
+        for key, value in metrics.items():
+            before = old.get(key)
+            numbers = (int, float)
+            if not isinstance(value, numbers) or not isinstance(before, numbers):
+                continue
+            change = f"{(value - before) / before * 100:+.1f}%" if before else ""
+            print(f"{name + '.' + key:<36}{before:>12}{value:>12}{change:>10}")
+
+
+def parse_size(text):
+    w, _, h = text.lower().partition("x")
+    return int(w), int(h)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--library", help="library folder (generated if empty)")
+    parser.add_argument("--depth", type=int, default=2, help="collection levels")
+    parser.add_argument("--fanout", type=int, default=3, help="children per level")
+    parser.add_argument("--schemas", type=int, default=60)
+    parser.add_argument("--layers", type=int, default=6)
+    parser.add_argument("--size", type=parse_size, default=(2000, 1500), help="WxH")
+    parser.add_argument("--format", choices=("png", "jpg"), default="png")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="passes per measurement")
+    parser.add_argument("--limit", type=int, default=30, help="max schemas rendered")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument(
+        "--fs-latency",
+        type=float,
+        default=0,
+        metavar="MS",
+        help="delay per stat / directory listing (simulated network share)",
+    )
+    parser.add_argument(
+        "--decode-processes",
+        type=int,
+        default=0,
+        metavar="N",
+        help="decode with N Pillow worker processes (default: Qt in-process)",
+    )
+    parser.add_argument("--out", help="write JSON results here")
+    parser.add_argument("--compare", metavar="JSON", help="baseline results")
+    parser.add_argument("--child", choices=BENCHMARKS, help=argparse.SUPPRESS)
+    opts = parser.parse_args(argv)
+
+    if opts.child:
+        run_child(opts.child, opts.library, opts)
+        return 0
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QT_VERSION_STR, PYQT_VERSION_STR
+
+    app = QApplication([])  # noqa: F841 (QPainter for the generator)
+    params = {
+        "depth": opts.depth,
+        "fanout": opts.fanout,
+        "schemas": opts.schemas,
+        "layers": opts.layers,
+        "size": list(opts.size),
+        "format": opts.format,
+        "seed": opts.seed,
+    }
+    name = "anato-bench-{schemas}x{layers}-{0}x{1}-{format}-d{depth}f{fanout}s{seed}"
+    root = opts.library or os.path.join(
+        tempfile.gettempdir(), name.format(*opts.size, **params)
+    )
+    t = time.perf_counter()
+    if ensure_library(root, params):
+        print(f"Generated {root} in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+
+    results = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": opts.repeat,
+            "limit": opts.limit,
+            "fs_latency_ms": opts.fs_latency,
+            "decode_processes": opts.decode_processes,
+            "library": params,
+        },
+        "results": {},
+    }
+    for name in opts.only:
+        print(f"Running {name}...", file=sys.stderr)
+        results["results"][name] = run_benchmark(name, root, opts)
+        print(f"  {json.dumps(results['results'][name])}", file=sys.stderr)
+
+    if opts.out:
+        with open(opts.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if opts.compare:
+        with open(opts.compare, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+    return 0
+
+
+STARTED = time.perf_counter()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anatovieer_v2 as av
+
+APP = av.QApplication.instance() or av.QApplication([av.APP_NAME])
+
+# Not a multiple of EXPORT_BAND either way: partial last band and tile column
+CANVAS = av.QSize(700, 600)
+
+
+def make_layer(path, size, rect, color):
+    image = av.QImage(size, av.QImage.Format.Format_ARGB32)
+    image.fill(av.Qt.GlobalColor.transparent)
+    painter = av.QPainter(image)
+    painter.fillRect(rect, av.QColor(color))
+    painter.end()
+    assert image.save(path)
+
+
+@pytest.fixture
+def schema(tmp_path):
+    folder = tmp_path / "Schema"
+    folder.mkdir()
+    make_layer(str(folder / "-1-a.png"), CANVAS, av.QRect(0, 0, 700, 300), "#204080")
+    make_layer(str(folder / "-2-b.png"), CANVAS, av.QRect(50, 200, 400, 300), "#c04020")
+    make_layer(str(folder / "-3-c.png"), CANVAS, av.QRect(300, 0, 150, 600), "#80ffff00")
+    return str(folder)
+
+
+def reference(layers, canvas_size, level=0):
+    image = av.composite_layers(layers, level, canvas_size)
+    return image.convertToFormat(av.QImage.Format.Format_RGBA8888)
+
+
+def assert_same_pixels(path, expected):
+    image = av.QImage(path)
+    assert not image.isNull()
+    image = image.convertToFormat(av.QImage.Format.Format_RGBA8888)
+    assert image.size() == expected.size()
+    # Every 7th pixel plus the last row and column (partial band / tile)
+    for y in [*range(0, expected.height(), 7), expected.height() - 1]:
+        for x in [*range(0, expected.width(), 7), expected.width() - 1]:
+            a, b = image.pixelColor(x, y), expected.pixelColor(x, y)
+            assert abs(a.red() - b.red()) <= 1, (x, y)
+            assert abs(a.green() - b.green()) <= 1, (x, y)
+            assert abs(a.blue() - b.blue()) <= 1, (x, y)
+            assert abs(a.alpha() - b.alpha()) <= 1, (x, y)
+
+
+@pytest.mark.parametrize("ext", [".png", ".tif"])
+def test_export_matches_the_painted_composite(schema, tmp_path, monkeypatch, ext):
+    monkeypatch.setattr(av._PngStreamWriter, "CHUNK", 4096)  # several IDATs
+    layers, canvas = av.load_export_layers(schema)
+    layers[1] = (layers[1][0], 0.5)
+    assert canvas == CANVAS
+    dest = str(tmp_path / ("out" + ext))
+    seen = []
+
+    assert av.export_composite(
+        layers, canvas, dest, progress=lambda done, rows: seen.append(done)
+    )
+    assert seen == [0, 256, 512, 600]
+    assert_same_pixels(dest, reference(layers, canvas))
+
+
+def test_half_scale_export_matches_the_painted_half_level(schema, tmp_path):
+    layers, canvas = av.load_export_layers(schema)
+    dest = str(tmp_path / "half.tif")
+    assert av.export_composite(layers, canvas, dest, scale=0.5)
+    assert_same_pixels(dest, reference(layers, canvas, level=1))
+
+
+def test_transparent_export_round_trips_through_pillow(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    image = av.QImage(CANVAS, av.QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(av.QColor(255, 0, 0, 128))
+    layers = [(av.ImagePyramid(image), 1.0)]
+    for ext in (".png", ".tiff"):
+        dest = str(tmp_path / ("out" + ext))
+        av.export_composite(layers, CANVAS, dest)
+        with Image.open(dest) as out:
+            assert out.mode == "RGBA"
+            assert out.size == (CANVAS.width(), CANVAS.height())
+            r, g, b, a = out.getpixel((699, 599))
+            assert (r, g, b) == (255, 0, 0) and abs(a - 128) <= 1
+
+
+def test_cancelled_export_leaves_no_file(schema, tmp_path):
+    layers, canvas = av.load_export_layers(schema)
+    dest = str(tmp_path / "out.png")
+    assert not av.export_composite(
+        layers, canvas, dest, progress=lambda done, rows: done > 0
+    )
+    assert os.listdir(tmp_path) == ["Schema"]
+
+
+def test_unsupported_format_is_refused(schema, tmp_path):
+    layers, canvas = av.load_export_layers(schema)
+    with pytest.raises(ValueError):
+        av.export_composite(layers, canvas, str(tmp_path / "out.jpg"))
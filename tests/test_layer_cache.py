@@ -0,0 +1,58 @@
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anatovieer_v2 as av
+
+APP = av.QApplication.instance() or av.QApplication([av.APP_NAME])
+
+
+def pyramid(width=100, height=100):
+    image = av.QImage(width, height, av.QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(av.Qt.GlobalColor.white)
+    return av.ImagePyramid(image)  # 40 000 bytes at 100x100
+
+
+def test_evicts_least_recently_used_within_budget():
+    cache = av.DecodedLayerCache(100_000)
+    for key in "abc":
+        assert cache.put(key, pyramid())
+    assert not cache.contains("a")  # 3 x 40 kB > 100 kB
+    assert cache.contains("b") and cache.contains("c")
+    assert cache.bytes <= cache.max_bytes
+    cache.get("b")  # b becomes most recent
+    cache.put("d", pyramid())
+    assert cache.contains("b") and not cache.contains("c")
+    assert cache.stats()["evictions"] == 2
+
+
+def test_too_large_is_not_stored():
+    cache = av.DecodedLayerCache(10_000)
+    assert not cache.put("big", pyramid())
+    assert cache.bytes == 0
+
+
+def test_contains_counts_nothing_and_keeps_order():
+    cache = av.DecodedLayerCache(100_000)
+    cache.put("a", pyramid())
+    cache.put("b", pyramid())
+    assert cache.contains("a") and not cache.contains("x")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 0)
+    cache.put("c", pyramid())
+    assert not cache.contains("a")  # the probe did not refresh it
+
+
+def test_put_keeps_pinned_keys_and_evicts_others():
+    cache = av.DecodedLayerCache(100_000)
+    cache.put("shown", pyramid())
+    cache.put("old", pyramid())
+    assert cache.put("next", pyramid(), keep={"shown", "next"})
+    assert cache.contains("shown") and cache.contains("next")
+    assert not cache.contains("old")
+    # Only fits by dropping pinned entries: refused, nothing evicted
+    assert not cache.put("prev", pyramid(), keep={"shown", "next", "prev"})
+    assert cache.contains("shown") and cache.contains("next")
+    assert not cache.contains("prev")
@@ -0,0 +1,100 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anatovieer_v2 as av
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANATO_CACHE_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "library"
+    for schema in ("A/heart", "A/lung", "B/brain"):
+        (root / schema).mkdir(parents=True)
+        (root / schema / "1 bone.png").write_bytes(b"x")
+    return str(root)
+
+
+def touch(path, ns):
+    os.utime(path, ns=(ns, ns))
+
+
+def test_refresh_relists_only_directories_whose_mtime_changed(library, monkeypatch):
+    catalog = av.LibraryCatalog.open(library)
+    assert catalog.layers(os.path.join(library, "A", "heart"))
+    listed = []
+    scan_dir = av.LibraryCatalog.scan_dir
+    monkeypatch.setattr(
+        av.LibraryCatalog,
+        "scan_dir",
+        staticmethod(lambda path, mtime: listed.append(path) or scan_dir(path, mtime)),
+    )
+    assert catalog.refresh() == set()
+    assert listed == []
+
+    lung = os.path.join(library, "A", "lung")
+    with open(os.path.join(lung, "2 muscle.png"), "wb") as f:
+        f.write(b"x")
+    touch(lung, catalog.nodes[lung].mtime_ns + 10**9)
+    assert catalog.refresh() == {lung}
+    assert listed == [lung]
+    assert [l[0] for l in catalog.layers(lung)] == ["1 bone.png", "2 muscle.png"]
+
+
+def test_refresh_drops_vanished_directories(library):
+    catalog = av.LibraryCatalog.open(library)
+    brain = os.path.join(library, "B", "brain")
+    os.remove(os.path.join(brain, "1 bone.png"))
+    os.rmdir(brain)
+    changed = catalog.refresh()
+    assert changed == {os.path.join(library, "B"), brain}
+    assert not catalog.contains(brain)
+    assert catalog.children(os.path.join(library, "B")) == []
+
+
+def test_catalog_survives_a_reload(library):
+    catalog = av.LibraryCatalog.open(library)
+    reloaded = av.LibraryCatalog(library)
+    reloaded.load()
+    assert set(reloaded.nodes) == set(catalog.nodes)
+    assert reloaded.refresh() == set()
+
+
+def test_rescan_relists_the_reported_directory_only(library):
+    catalog = av.LibraryCatalog.open(library)
+    a = os.path.join(library, "A")
+    heart = os.path.join(a, "heart")
+    lung = os.path.join(a, "lung")
+    # Not reported by the watcher, so not re-listed even though it changed
+    with open(os.path.join(heart, "2 muscle.png"), "wb") as f:
+        f.write(b"x")
+    os.makedirs(os.path.join(a, "kidney", "left"))
+    with open(os.path.join(a, "kidney", "left", "1 bone.png"), "wb") as f:
+        f.write(b"x")
+    for name in os.listdir(lung):
+        os.remove(os.path.join(lung, name))
+    os.rmdir(lung)
+
+    changed = catalog.rescan({a})
+    kidney = os.path.join(a, "kidney")
+    assert changed == {a, lung, kidney, os.path.join(kidney, "left")}
+    assert [c[0] for c in catalog.children(a)] == ["heart", "kidney"]
+    assert len(catalog.layers(heart)) == 1
+    assert catalog.layers(os.path.join(kidney, "left"))
+
+
+def test_rescan_of_a_vanished_directory_drops_its_subtree(library):
+    catalog = av.LibraryCatalog.open(library)
+    b = os.path.join(library, "B")
+    os.remove(os.path.join(b, "brain", "1 bone.png"))
+    os.rmdir(os.path.join(b, "brain"))
+    os.rmdir(b)
+    assert catalog.rescan({b, os.path.join(b, "brain")}) == {
+        b,
+        os.path.join(b, "brain"),
+    }
+    assert not catalog.contains(b)
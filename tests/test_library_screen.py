@@ -0,0 +1,23 @@
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anatovieer_v2 as av
+
+APP = av.QApplication.instance() or av.QApplication([av.APP_NAME])
+
+
+def test_missing_saved_root_keeps_the_select_folder_prompt(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANATO_CACHE_DIR", str(tmp_path / "cache"))
+    screen = av.LibraryScreen()
+    screen.pending_root = str(tmp_path / "unmounted")
+    ready = []
+    screen.libraryReady.connect(lambda: ready.append(True))
+
+    screen.restore_library()
+    assert ready == [True]
+    assert screen.root_path == ""
+    assert screen.catalog is None
+    assert screen.lbl_path.text() == "Select a Root Folder"
@@ -0,0 +1,67 @@
+import os
+import signal
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+import anatovieer_v2 as av
+
+APP = av.QApplication.instance() or av.QApplication([av.APP_NAME])
+
+
+def level0_pixels(pyramid):
+    image = pyramid.levels[0]
+    w, h = image.width(), image.height()
+    return [image.pixel(x, y) for y in range(h) for x in range(w)]
+
+
+@pytest.fixture
+def inline_decoder(monkeypatch):
+    decoder = av.PillowDecoder(0)
+    monkeypatch.setattr(av, "_pillow_decoder", decoder)
+    return decoder
+
+
+def test_16bit_grey_layer_is_left_to_qt(tmp_path, inline_decoder):
+    path = str(tmp_path / "grey16.png")
+    Image.new("I;16", (40, 30), 0x0B0B).save(path)
+    assert inline_decoder.pyramid(path) is None
+    pyramid = av.load_layer_pyramid(path)
+    assert level0_pixels(pyramid) == level0_pixels(av.ImagePyramid.from_file(path))
+    assert pyramid.levels[0].pixel(0, 0) != 0xFFFFFFFF
+
+
+def test_rgba_layer_matches_qt(tmp_path, inline_decoder):
+    path = str(tmp_path / "layer.png")
+    image = Image.new("RGBA", (64, 48), (0, 0, 0, 0))
+    image.paste((200, 100, 50, 128), (10, 5, 40, 30))
+    image.paste((20, 220, 90, 255), (30, 20, 50, 40))
+    image.save(path)
+    pyramid = inline_decoder.pyramid(path)
+    expected = av.ImagePyramid.from_file(path)
+    assert pyramid.offset == expected.offset
+    assert pyramid.canvas_size == expected.canvas_size
+    assert level0_pixels(pyramid) == level0_pixels(expected)
+
+
+@pytest.mark.skipif(not av.PillowDecoder.available(), reason="no Pillow pool here")
+def test_broken_pool_falls_back_to_qt(tmp_path, monkeypatch):
+    path = str(tmp_path / "layer.png")
+    Image.new("RGBA", (64, 48), (200, 100, 50, 255)).save(path)
+    decoder = av.PillowDecoder(1)
+    monkeypatch.setattr(av, "_pillow_decoder", decoder)
+    try:
+        assert decoder.pyramid(path) is not None
+        for pid in list(decoder.pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        for _ in range(2):  # broken pool, then its replacement
+            pyramid = av.load_layer_pyramid(path)
+            assert pyramid is not None
+            assert level0_pixels(pyramid)[0] == 0xFFC86432
+    finally:
+        decoder.pool.shutdown()
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anatovieer_v2 as av
+
+SCHEMAS = [
+    ("Sweetheart", "1 x.png"),
+    ("Lung", "1 heart wall.png"),
+    ("Cardio/Open Heart", "1 x.png"),
+    ("Heartbeat", "1 x.png"),
+    ("Heart", "1 aorta.png"),
+]
+
+
+def add_schema(root, schema, layer):
+    os.makedirs(os.path.join(root, schema))
+    with open(os.path.join(root, schema, layer), "wb") as f:
+        f.write(b"x")
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANATO_CACHE_DIR", str(tmp_path / "cache"))
+    root = str(tmp_path / "library")
+    for schema, layer in SCHEMAS:
+        add_schema(root, schema, layer)
+    return av.LibraryCatalog.open(root)
+
+
+def test_ranks_exact_prefix_word_and_substring_matches(catalog):
+    results, _ = av.SearchIndex.from_catalog(catalog).search("HEART")
+    assert [(name, layer) for name, _, _, layer in results] == [
+        ("Heart", None),  # exact
+        ("Heartbeat", None),  # prefix
+        ("Open Heart", None),  # word prefix
+        ("Lung", "1 Heart Wall"),  # word prefix of a layer name
+        ("Sweetheart", None),  # substring
+    ]
+    assert results[2][1] == os.path.join(catalog.root, "Cardio", "Open Heart")
+    assert av.SearchIndex.from_catalog(catalog).search("  ") == ([], None)
+
+
+def test_growing_query_narrows_the_previous_matches(catalog):
+    index = av.SearchIndex.from_catalog(catalog)
+    _, state = index.search("he")
+    for query in ("hea", "heart", "heartb"):
+        results, state = index.search(query, previous=state)
+        assert results == index.search(query)[0]
+    assert [r[0] for r in results] == ["Heartbeat"]
+
+    # Narrowing only re-checks the previous matches
+    _, state = index.search("aorta")
+    assert index.search("aorta", previous=state)[0][0][0] == "Heart"
+    assert index.search("heart", previous=(index.version, "", []))[0] == []
+
+
+def test_changed_directories_invalidate_narrowing(catalog):
+    index = av.SearchIndex.from_catalog(catalog)
+    _, state = index.search("heart")
+    add_schema(catalog.root, "Heart valves", "1 x.png")
+    index.update_dirs(catalog, catalog.refresh())
+    results, _ = index.search("heart v", previous=state)
+    assert [r[0] for r in results] == ["Heart valves"]
+
+    lung = os.path.join(catalog.root, "Lung")
+    os.remove(os.path.join(lung, "1 heart wall.png"))
+    os.rmdir(lung)
+    index.update_dirs(catalog, catalog.refresh())
+    assert "Lung" not in [r[0] for r in index.search("heart")[0]]
+
+
+def test_cancelled_search_returns_none(catalog):
+    index = av.SearchIndex.from_catalog(catalog)
+    for i in range(1100):
+        index.docs[f"extra{i}"] = ("heart", "Heart", f"/x/{i}", False, None)
+    assert index.search("he", cancelled=lambda: True) is None
@@ -0,0 +1,76 @@
+import gc
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anatovieer_v2 as av
+
+APP = av.QApplication.instance() or av.QApplication([av.APP_NAME])
+
+
+def make_layer(path, size, rect, color):
+    image = av.QImage(size, av.QImage.Format.Format_ARGB32)
+    image.fill(av.Qt.GlobalColor.transparent)
+    painter = av.QPainter(image)
+    painter.fillRect(rect, av.QColor(color))
+    painter.end()
+    assert image.save(path)
+
+
+def spin(until, timeout=10):
+    end = time.perf_counter() + timeout
+    while not until() and time.perf_counter() < end:
+        APP.processEvents()
+    return until()
+
+
+def test_preview_outlives_its_dropped_pack_pyramid(tmp_path):
+    folder = tmp_path / "Schema"
+    folder.mkdir()
+    size = av.QSize(1600, 1200)
+    make_layer(str(folder / "-1-a.png"), size, av.QRect(0, 0, 1600, 1200), "#204080")
+    make_layer(str(folder / "-2-b.png"), size, av.QRect(400, 300, 800, 600), "#c04020")
+    pack = str(tmp_path / ("Schema" + av.PACK_EXT))
+    av.write_schema_pack(str(folder), pack)
+
+    pyramid = av.SchemaPack.open(pack).pyramid("-1-a.png")
+    assert pyramid.mapped
+    loader = av.ThumbnailLoader()
+    loader.pool.setMaxThreadCount(0)  # hold the job until the pyramid is gone
+    ready = []
+    loader.previewReady.connect(lambda key, image: ready.append((key, image)))
+    key = pyramid.key
+    assert loader.preview(key, pyramid) is None
+
+    del pyramid
+    av.SchemaPack._cache.clear()  # nothing but the queued job keeps the mapping
+    gc.collect()
+    loader.pool.setMaxThreadCount(1)
+    loader._workers += 1
+    loader.pool.start(av._ThumbnailWorker(loader))
+
+    assert spin(lambda: ready)
+    (done_key, image), = ready
+    assert done_key == key
+    assert image.width() == av.LAYER_PREVIEW_SIZE
+    assert image.pixelColor(10, 10).name() == "#204080"
+
+
+def test_retain_drops_queued_cards_out_of_reach_but_keeps_previews():
+    loader = av.ThumbnailLoader()
+    loader.pool.setMaxThreadCount(0)  # nothing runs; inspect the queue
+    for priority, path in enumerate(("a", "b", "c")):
+        loader.request(path, priority % 2)
+    image = av.QImage(8, 8, av.QImage.Format.Format_ARGB32)
+    loader.preview("hover", av.ImagePyramid(image))
+
+    loader.retain({"b", "x"})
+    assert loader._queued == {"b": 1, "hover": loader.PREVIEW_PRIORITY}
+    loader.request("a")  # scrolled back into reach
+    order = []
+    while loader._queue:
+        order.append(av.heapq.heappop(loader._queue)[2])
+    assert order == ["hover", "b", "a"]